@@ -0,0 +1,370 @@
+"""
+AWAS Middleware for ASGI/asyncio
+Version 1.0.0
+
+Provides the features of the Flask AWASMiddleware to any ASGI
+application (Starlette, FastAPI, Quart, ...) without depending on a
+framework: discovery documents, rate limiting, manifest-driven input
+validation and audit logging. Both middleware share the same
+CompiledManifest core, so manifests, limits and validators behave
+identically.
+
+Requests whose method and path match an action's `method` and
+`endpoint` are validated before the application sees them; validated
+parameters (with declared defaults) are passed on in
+scope['state']['awas_params'].
+"""
+
+import asyncio
+import json
+import logging
+import math
+import time
+from datetime import datetime
+from typing import Dict, Iterable, Optional, Tuple
+from urllib.parse import parse_qsl
+
+from awas_audit import AuditSink, snapshot
+from awas_documents import DEFAULT_CACHE_CONTROL
+from awas_manifest import ManifestHost
+from awas_preview import DRY_RUN_HEADER
+from awas_ratelimit import RATE_LIMIT_ERRORS, RateLimitBackend, RateLimitDecision
+
+logger = logging.getLogger(__name__)
+
+# Largest request body read for validation
+DEFAULT_MAX_BODY_SIZE = 1024 * 1024
+
+
+class RequestHeaders(dict):
+    """Case-insensitive view of ASGI request headers"""
+
+    def __init__(self, raw: Iterable[Tuple[bytes, bytes]]):
+        super().__init__()
+        for name, value in raw:
+            name = name.decode('latin-1').lower()
+            value = value.decode('latin-1')
+            self[name] = f'{self[name]}, {value}' if name in self else value
+
+    def get(self, name: str, default=None):
+        return super().get(name.lower(), default)
+
+    def __contains__(self, name) -> bool:
+        return super().__contains__(name.lower())
+
+
+class AWASASGIMiddleware(ManifestHost):
+    """
+    ASGI middleware handling AWAS requests
+
+    Usage:
+        app = AWASASGIMiddleware(app, manifest_path='.well-known/ai-actions.json')
+    """
+
+    def __init__(self, app, manifest_path: str = '.well-known/ai-actions.json',
+                 enable_rate_limiting: bool = True, enable_logging: bool = True,
+                 rate_limit_algorithm: str = 'sliding_window',
+                 rate_limit_max_clients: int = 10000,
+                 rate_limit_backend: Optional[RateLimitBackend] = None,
+                 manifest_cache_control: str = DEFAULT_CACHE_CONTROL,
+                 reload_interval: Optional[float] = None,
+                 audit_sink: Optional[AuditSink] = None,
+                 max_body_size: int = DEFAULT_MAX_BODY_SIZE):
+        """
+        Initialize AWAS ASGI middleware
+
+        Args:
+            app: ASGI application to wrap
+            manifest_path: Path to AI actions manifest
+            enable_rate_limiting: Enable rate limiting for AI agents
+            enable_logging: Enable audit logging
+            rate_limit_algorithm: 'sliding_window' or 'token_bucket'
+            rate_limit_max_clients: Maximum number of clients tracked for rate limiting
+            rate_limit_backend: Where rate limit state is kept (default: in-process)
+            manifest_cache_control: Cache-Control header for the manifest
+            reload_interval: Seconds between manifest change checks (None disables hot reload)
+            audit_sink: Where audit records are queued (default: logger output)
+            max_body_size: Largest request body accepted for action endpoints
+        """
+        self.app = app
+        self.enable_rate_limiting = enable_rate_limiting
+        self.enable_logging = enable_logging
+        self.audit_sink = audit_sink
+        self.max_body_size = max_body_size
+        self._init_manifest(manifest_path, rate_limit_backend, rate_limit_algorithm,
+                            rate_limit_max_clients, manifest_cache_control)
+        self._start_watcher(reload_interval)
+
+        logger.info("AWAS ASGI Middleware initialized")
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        # Use one manifest version for the whole request
+        compiled = self.compiled
+        headers = RequestHeaders(scope.get('headers', ()))
+        method = scope['method']
+        path = scope['path']
+
+        decision = None
+        client_id = None
+        if self.enable_rate_limiting and self._is_ai_agent(headers):
+            client_id = self._get_client_id(scope, headers)
+            decision = await self.rate_limit_backend.ahit(client_id, time.time())
+            if decision.exceeded:
+                await self._send_json(send, 429, {
+                    "error": RATE_LIMIT_ERRORS[decision.exceeded],
+                    "retry_after": math.ceil(decision.retry_after)
+                }, decision)
+                return
+            if compiled.rate_limiter.concurrency is None:
+                client_id = None
+
+        try:
+            document = compiled.document(path)
+            if document is not None and method in ('GET', 'HEAD'):
+                status, document_headers, body = document.respond(headers)
+                await self._send(send, status, document_headers.items(),
+                                 body if method == 'GET' else b'', decision)
+                return
+
+            action = compiled.registry.for_route(method, path)
+            if action is None:
+                await self.app(scope, receive, self._with_headers(send, decision, None))
+                return
+
+            await self._handle_action(compiled, action, scope, receive, send, headers, decision)
+        finally:
+            # Release the concurrent request slot after the response completes
+            if client_id is not None:
+                await self.rate_limit_backend.arelease(client_id, time.time())
+
+    async def _handle_action(self, compiled, action: Dict, scope, receive, send,
+                             headers: RequestHeaders, decision: Optional[RateLimitDecision]):
+        """Check limits, authentication and inputs for an action, then call the application"""
+        action_id = action['id']
+
+        # Check per-action rate limit hint
+        if self.enable_rate_limiting and self._is_ai_agent(headers):
+            action_limit = compiled.action_rate_limits.get(action_id)
+            action_decision = action_limit and await action_limit.ahit(
+                self._get_client_id(scope, headers), time.time()
+            )
+            if action_decision and action_decision.exceeded:
+                await self._send_json(send, 429, {
+                    "error": f"Rate limit exceeded for action: {action_id}",
+                    "retry_after": math.ceil(action_decision.retry_after)
+                }, action_decision)
+                return
+
+        # The application answers dry runs only for actions that declare them
+        if headers.get(DRY_RUN_HEADER) == 'true' and not action.get('dryRunSupported'):
+            await self._send_json(send, 400, {
+                "error": f"Dry run not supported for action: {action_id}"
+            }, decision)
+            return
+
+        # Check authentication
+        if action.get('authentication_required', False):
+            if not self._check_authentication(scope, headers):
+                await self._send_json(send, 401, {
+                    "error": "Authentication required"
+                }, decision)
+                return
+
+        # Read inputs
+        body = b''
+        if scope['method'] in ('POST', 'PUT', 'PATCH'):
+            body = await self._read_body(receive)
+            if body is None:
+                await self._send_json(send, 413, {
+                    "error": "Request body too large"
+                }, decision)
+                return
+            data = {}
+            if body and 'json' in headers.get('content-type', ''):
+                try:
+                    data = json.loads(body) or {}
+                except ValueError:
+                    await self._send_json(send, 400, {
+                        "error": "Invalid JSON body"
+                    }, decision)
+                    return
+                if not isinstance(data, dict):
+                    await self._send_json(send, 400, {
+                        "error": "Validation failed",
+                        "details": ["Request parameters must be of type object"]
+                    }, decision)
+                    return
+        else:
+            data = {}
+            for name, value in parse_qsl(scope.get('query_string', b'').decode('latin-1'),
+                                         keep_blank_values=True):
+                data.setdefault(name, value)
+
+        # Validate inputs
+        validator = compiled.input_validators[action_id]
+        errors = validator(data)
+        if errors:
+            await self._send_json(send, 400, {
+                "error": "Validation failed",
+                "details": errors
+            }, decision)
+            return
+
+        # Validated parameters with declared defaults applied
+        scope = dict(scope)
+        state = scope['state'] = dict(scope.get('state') or {})
+        state['awas_action'] = action
+        state['awas_params'] = validator.apply_defaults(data)
+
+        # Log action
+        if self.enable_logging:
+            await self._log_action(action_id, data, scope, headers)
+
+        await self.app(scope, self._replay_body(body, receive),
+                       self._with_headers(send, decision, action_id))
+
+    def _is_ai_agent(self, headers: RequestHeaders) -> bool:
+        """Check if request is from an AI agent"""
+        return headers.get('X-AI-Agent') == 'true'
+
+    def _get_client_id(self, scope, headers: RequestHeaders) -> str:
+        """Get client identifier for rate limiting"""
+        client = scope.get('client')
+        return headers.get('X-AI-Agent-Name', client[0] if client else None)
+
+    def _check_authentication(self, scope, headers: RequestHeaders) -> bool:
+        """Check if request is authenticated (override this method)"""
+        # Implement your authentication logic
+        return 'Authorization' in headers or 'user_id' in (scope.get('state') or {})
+
+    async def _read_body(self, receive) -> Optional[bytes]:
+        """Read the whole request body (None if it exceeds max_body_size)"""
+        chunks = []
+        size = 0
+        while True:
+            message = await receive()
+            if message['type'] != 'http.request':
+                break
+            chunk = message.get('body', b'')
+            size += len(chunk)
+            if size > self.max_body_size:
+                return None
+            chunks.append(chunk)
+            if not message.get('more_body', False):
+                break
+        return b''.join(chunks)
+
+    @staticmethod
+    def _replay_body(body: bytes, receive):
+        """receive() that hands the already-read body to the application"""
+        pending = [{'type': 'http.request', 'body': body, 'more_body': False}]
+
+        async def replay():
+            if pending:
+                return pending.pop()
+            return await receive()
+        return replay
+
+    @staticmethod
+    def _with_headers(send, decision: Optional[RateLimitDecision], action_id: Optional[str]):
+        """send() that adds rate limit and AWAS action headers to the response"""
+        if decision is None and action_id is None:
+            return send
+
+        async def send_with_headers(message):
+            if message['type'] == 'http.response.start':
+                extra = []
+                if decision is not None:
+                    extra.extend(decision.headers().items())
+                if action_id is not None and message['status'] < 400:
+                    extra.append(('X-AI-Action-Success', 'true'))
+                    extra.append(('X-AI-Action-ID', action_id))
+                message = dict(message)
+                message['headers'] = [
+                    *message.get('headers', ()),
+                    *((name.encode('latin-1'), value.encode('latin-1')) for name, value in extra)
+                ]
+            await send(message)
+        return send_with_headers
+
+    async def _send(self, send, status: int, headers: Iterable[Tuple[str, str]], body: bytes,
+                    decision: Optional[RateLimitDecision] = None):
+        """Send a complete response"""
+        headers = list(headers)
+        if decision is not None:
+            headers.extend(decision.headers().items())
+        await send({
+            'type': 'http.response.start',
+            'status': status,
+            'headers': [(name.encode('latin-1'), str(value).encode('latin-1'))
+                        for name, value in headers]
+        })
+        await send({'type': 'http.response.body', 'body': body})
+
+    async def _send_json(self, send, status: int, payload: Dict,
+                         decision: Optional[RateLimitDecision] = None):
+        body = json.dumps(payload).encode('utf-8')
+        await self._send(send, status, [
+            ('Content-Type', 'application/json'),
+            ('Content-Length', str(len(body)))
+        ], body, decision)
+
+    async def _log_action(self, action_id: str, params: Dict, scope, headers: RequestHeaders):
+        """Log AI action for audit trail"""
+        client = scope.get('client')
+        record = (
+            time.time(),
+            action_id,
+            headers.get('X-AI-Agent-Name', 'Unknown'),
+            client[0] if client else None,
+            scope['state'].get('user_id', 'anonymous'),
+            snapshot(params)
+        )
+        if self.audit_sink is not None:
+            if self.audit_sink.blocking:
+                # A full queue must not stall the event loop
+                await asyncio.to_thread(self.audit_sink.submit, record)
+            else:
+                self.audit_sink.submit(record)
+            return
+
+        log_entry = {
+            'timestamp': datetime.utcnow().isoformat(),
+            'action_id': action_id,
+            'ai_agent': record[2],
+            'ip_address': record[3],
+            'params': params,
+            'user_id': record[4]
+        }
+
+        logger.info(f"AI_ACTION: {json.dumps(log_entry)}")
+
+
+# Example Usage
+if __name__ == '__main__':
+    import uvicorn
+
+    async def search_products(scope, receive, send):
+        params = scope['state']['awas_params']
+
+        # Your search logic here
+        body = json.dumps({"results": [], "query": params['q']}).encode('utf-8')
+        await send({
+            'type': 'http.response.start',
+            'status': 200,
+            'headers': [(b'content-type', b'application/json')]
+        })
+        await send({'type': 'http.response.body', 'body': body})
+
+    app = AWASASGIMiddleware(
+        search_products,
+        manifest_path='.well-known/ai-actions.json',
+        enable_rate_limiting=True,
+        enable_logging=True
+    )
+
+    uvicorn.run(app, host='127.0.0.1', port=8000)
@@ -0,0 +1,469 @@
+"""
+AWAS Audit Logging
+Version 1.0.0
+
+Keeps audit logging off the request path: request handlers enqueue a
+compact tuple on a bounded in-memory queue and a background writer
+serializes batches to newline-delimited JSON files, rotating them by
+size and age.
+
+SegmentAuditSink writes the same records in a length-prefixed binary
+format instead, closing each segment with an index on action_id,
+ai_agent and user_id plus its time range, so AuditSegment (and the
+awas_audit_query tool) can answer lookups without parsing every record.
+"""
+
+import atexit
+import json
+import logging
+import mmap
+import os
+import queue
+import struct
+import threading
+import time
+from array import array
+from datetime import datetime, timezone
+from typing import Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# (timestamp, action_id, ai_agent, ip_address, user_id, params)
+AuditRecord = Tuple[float, str, str, Optional[str], str, Dict]
+
+RECORD_FIELDS = ('timestamp', 'action_id', 'ai_agent', 'ip_address', 'user_id', 'params')
+
+# Queued by close() to stop the writer once earlier records are written
+_STOP = object()
+
+
+class AuditSink:
+    """Interface for audit record destinations"""
+
+    # Whether submit() may wait (asyncio servers then call it from a worker thread)
+    blocking = False
+
+    def submit(self, record: AuditRecord):
+        """Accept one audit record"""
+        raise NotImplementedError
+
+    def close(self):
+        """Flush pending records and release resources"""
+
+    def stats(self) -> Dict:
+        """Report sink statistics"""
+        return {}
+
+
+def snapshot(value):
+    """
+    Copy of JSON-like request data for a record
+
+    Records are serialized later on the writer thread, so they must not
+    share dicts or lists a handler may still change.
+    """
+    if isinstance(value, dict):
+        return {key: snapshot(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [snapshot(item) for item in value]
+    return value
+
+
+def record_to_dict(record: AuditRecord) -> Dict:
+    """Expand a compact record into the audit log entry format"""
+    entry = dict(zip(RECORD_FIELDS, record))
+    entry['timestamp'] = datetime.fromtimestamp(record[0], timezone.utc).replace(tzinfo=None).isoformat()
+    return entry
+
+
+class BatchingAuditSink(AuditSink):
+    """
+    Bounded queue drained by a background thread into rotating NDJSON files
+
+    Usage:
+        sink = BatchingAuditSink('/var/log/awas', on_full='drop')
+        awas = AWASMiddleware(app, audit_sink=sink)
+    """
+
+    suffix = '.ndjson'
+
+    def __init__(self, directory: str, max_queue: int = 10000, on_full: str = 'drop',
+                 batch_size: int = 500, flush_interval: float = 1.0,
+                 max_bytes: int = 64 * 1024 * 1024, rotate_interval: float = 3600,
+                 prefix: str = 'audit'):
+        """
+        Initialize batching audit sink
+
+        Args:
+            directory: Directory for audit files
+            max_queue: Maximum records waiting to be written
+            on_full: 'drop' (count and discard) or 'block' (wait for space)
+            batch_size: Maximum records written per batch
+            flush_interval: Maximum seconds a record waits before being written
+            max_bytes: Rotate the file once it reaches this size
+            rotate_interval: Rotate the file once it is this many seconds old
+            prefix: File name prefix
+        """
+        if on_full not in ('drop', 'block'):
+            raise ValueError(f"Unknown queue full policy: {on_full}")
+
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.on_full = on_full
+        self.blocking = on_full == 'block'
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_bytes = max_bytes
+        self.rotate_interval = rotate_interval
+        self.prefix = prefix
+
+        self.dropped = 0
+        self.written = 0
+        self.rotations = 0
+
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._file = None
+        self._file_size = 0
+        self._file_opened = 0.0
+        self._sequence = 0
+        self._drop_lock = threading.Lock()
+        self._closed = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='awas-audit-writer', daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def submit(self, record: AuditRecord):
+        """Enqueue a record without blocking (unless the policy is 'block')"""
+        if self.on_full == 'block':
+            self._queue.put(record)
+            return
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            with self._drop_lock:
+                self.dropped += 1
+
+    def _run(self):
+        """Writer loop: wait for a record, then drain a batch and write it"""
+        stopping = False
+        while not (stopping and self._queue.empty()):
+            try:
+                record = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                self._maybe_rotate(time.time())
+                continue
+
+            batch = []
+            while True:
+                if record is _STOP:
+                    stopping = True
+                else:
+                    batch.append(record)
+                    if len(batch) >= self.batch_size:
+                        break
+                try:
+                    record = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+
+            if batch:
+                try:
+                    self._write(batch)
+                except Exception:
+                    logger.exception(f"Failed to write {len(batch)} audit records")
+
+        if self._file is not None:
+            self._close_file()
+
+    def _encode(self, batch) -> bytes:
+        """Serialize a batch for the current file"""
+        return ''.join(
+            json.dumps(record_to_dict(record), default=str) + '\n' for record in batch
+        ).encode('utf-8')
+
+    def _write(self, batch):
+        """Serialize a batch and append it in one write"""
+        now = time.time()
+        self._maybe_rotate(now)
+        if self._file is None:
+            self._open(now)
+
+        data = self._encode(batch)
+        self._file.write(data)
+        self._file.flush()
+        self._file_size += len(data)
+        self.written += len(batch)
+
+    def _maybe_rotate(self, now: float):
+        if self._file is None:
+            return
+        if self._file_size >= self.max_bytes or now - self._file_opened >= self.rotate_interval:
+            self._close_file()
+            self.rotations += 1
+
+    def _open(self, now: float):
+        stamp = datetime.fromtimestamp(now, timezone.utc).strftime('%Y%m%dT%H%M%S')
+        self._sequence += 1
+        name = f'{self.prefix}-{stamp}-{os.getpid()}-{self._sequence}{self.suffix}'
+        self._file = open(os.path.join(self.directory, name), 'ab')
+        self._file_size = self._file.tell()
+        self._file_opened = now
+
+    def _close_file(self):
+        self._file.close()
+        self._file = None
+
+    def close(self):
+        """Write every queued record and stop the writer"""
+        if self._closed.is_set():
+            return
+        self._closed.set()
+        self._queue.put(_STOP)
+        self._thread.join()
+
+    def stats(self) -> Dict:
+        return {
+            'queued': self._queue.qsize(),
+            'dropped': self.dropped,
+            'written': self.written,
+            'rotations': self.rotations
+        }
+
+
+# Segment layout:
+#   SEGMENT_MAGIC
+#   records:  RECORD_HEADER, action_id, ai_agent, ip_address, user_id, params JSON
+#   index:    uint64 record offsets grouped by (field, value), 8-byte aligned
+#   directory JSON: {field: {value: [first, count]}}, records_end, count, min_ts, max_ts
+#   trailer:  TRAILER (index offset, directory offset, INDEX_MAGIC)
+# A segment without a trailer (still open, or cut short by a crash) is
+# read by scanning its records up to the first incomplete or invalid one.
+SEGMENT_MAGIC = b'AWASAUD1'
+INDEX_MAGIC = b'AWASIDX1'
+SEGMENT_SUFFIX = '.awasseg'
+
+# Record length (excluding this prefix), timestamp, lengths of the four strings
+RECORD_HEADER = struct.Struct('<IdHHHH')
+TRAILER = struct.Struct('<QQ8s')
+
+INDEXED_RECORD_FIELDS = ('action_id', 'ai_agent', 'user_id')
+
+
+def encode_record(record: AuditRecord) -> bytes:
+    """Encode a record as one length-prefixed binary entry"""
+    timestamp, action_id, ai_agent, ip_address, user_id, params = record
+    strings = [str(value or '').encode('utf-8')[:0xFFFF]
+               for value in (action_id, ai_agent, ip_address, user_id)]
+    body = json.dumps(params, default=str, separators=(',', ':')).encode('utf-8')
+    length = RECORD_HEADER.size - 4 + sum(len(value) for value in strings) + len(body)
+    return b''.join([
+        RECORD_HEADER.pack(length, timestamp, *(len(value) for value in strings)),
+        *strings,
+        body
+    ])
+
+
+def decode_record(buffer, offset: int) -> AuditRecord:
+    """Decode the record starting at offset"""
+    length, timestamp, *lengths = RECORD_HEADER.unpack_from(buffer, offset)
+    position = offset + RECORD_HEADER.size
+    strings = []
+    for size in lengths:
+        strings.append(bytes(buffer[position:position + size]).decode('utf-8'))
+        position += size
+    params = json.loads(bytes(buffer[position:offset + 4 + length]))
+    action_id, ai_agent, ip_address, user_id = strings
+    return (timestamp, action_id, ai_agent, ip_address or None, user_id, params)
+
+
+class SegmentAuditSink(BatchingAuditSink):
+    """
+    Batching sink writing indexed binary segments
+
+    Usage:
+        sink = SegmentAuditSink('/var/log/awas', max_bytes=256 * 1024 * 1024)
+        awas = AWASMiddleware(app, audit_sink=sink)
+    """
+
+    suffix = SEGMENT_SUFFIX
+
+    def _open(self, now: float):
+        super()._open(now)
+        self._file.write(SEGMENT_MAGIC)
+        self._file_size += len(SEGMENT_MAGIC)
+        self._postings = {field: {} for field in INDEXED_RECORD_FIELDS}
+        self._count = 0
+        self._min_ts = None
+        self._max_ts = None
+
+    def _encode(self, batch) -> bytes:
+        chunks = []
+        offset = self._file_size
+        postings = self._postings
+        for record in batch:
+            entry = encode_record(record)
+            chunks.append(entry)
+
+            timestamp, action_id, ai_agent, _, user_id, _ = record
+            for field, value in zip(INDEXED_RECORD_FIELDS, (action_id, ai_agent, user_id)):
+                postings[field].setdefault(str(value or ''), array('Q')).append(offset)
+            if self._min_ts is None or timestamp < self._min_ts:
+                self._min_ts = timestamp
+            if self._max_ts is None or timestamp > self._max_ts:
+                self._max_ts = timestamp
+            offset += len(entry)
+        self._count += len(batch)
+        return b''.join(chunks)
+
+    def _close_file(self):
+        """Append the segment index and trailer, then close"""
+        records_end = self._file_size
+        padding = -records_end % 8
+        index_offset = records_end + padding
+        offsets = array('Q')
+        directory = {}
+        for field, values in self._postings.items():
+            directory[field] = {}
+            for value, positions in values.items():
+                directory[field][value] = [len(offsets), len(positions)]
+                offsets.extend(positions)
+
+        directory_offset = index_offset + len(offsets) * offsets.itemsize
+        self._file.write(b'\0' * padding + offsets.tobytes())
+        self._file.write(json.dumps({
+            'fields': directory,
+            'records_end': records_end,
+            'count': self._count,
+            'min_ts': self._min_ts,
+            'max_ts': self._max_ts
+        }, separators=(',', ':')).encode('utf-8'))
+        self._file.write(TRAILER.pack(index_offset, directory_offset, INDEX_MAGIC))
+        super()._close_file()
+
+
+class AuditSegment:
+    """
+    Memory-mapped reader for one binary audit segment
+
+    Usage:
+        with AuditSegment(path) as segment:
+            for record in segment.query(action_id='add_to_cart', ai_agent='Claude'):
+                ...
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) \
+                if os.fstat(f.fileno()).st_size else b''
+        if self._map[:len(SEGMENT_MAGIC)] != SEGMENT_MAGIC:
+            raise ValueError(f"Not an audit segment: {path}")
+
+        self.indexed = False
+        self._offsets = None
+        end = len(self._map)
+        if end >= len(SEGMENT_MAGIC) + TRAILER.size:
+            index_offset, directory_offset, magic = TRAILER.unpack_from(self._map, end - TRAILER.size)
+            if magic == INDEX_MAGIC:
+                directory = json.loads(bytes(self._map[directory_offset:end - TRAILER.size]))
+                self._offsets = memoryview(self._map)[index_offset:directory_offset].cast('Q')
+                self._fields = directory['fields']
+                self.count = directory['count']
+                self.min_ts = directory['min_ts']
+                self.max_ts = directory['max_ts']
+                self.records_end = directory['records_end']
+                self.indexed = True
+
+        if not self.indexed:
+            self._build_index()
+
+    def _build_index(self):
+        """Scan an unterminated segment and index it in memory"""
+        fields = {field: {} for field in INDEXED_RECORD_FIELDS}
+        offsets = []
+        self.min_ts = self.max_ts = None
+        for offset in self._scan():
+            try:
+                timestamp, action_id, ai_agent, _, user_id, _ = decode_record(self._map, offset)
+            except ValueError:
+                # Part of an index that was cut short while being written
+                break
+            for field, value in zip(INDEXED_RECORD_FIELDS, (action_id, ai_agent, user_id)):
+                fields[field].setdefault(value, []).append(offset)
+            offsets.append(offset)
+            self.min_ts = timestamp if self.min_ts is None else min(self.min_ts, timestamp)
+            self.max_ts = timestamp if self.max_ts is None else max(self.max_ts, timestamp)
+        self._postings = fields
+        self._all = offsets
+        self.count = len(offsets)
+
+    def _scan(self, end: Optional[int] = None) -> Iterator[int]:
+        """Offsets of every complete record"""
+        end = len(self._map) if end is None else end
+        offset = len(SEGMENT_MAGIC)
+        while offset + RECORD_HEADER.size <= end:
+            length, _, *lengths = RECORD_HEADER.unpack_from(self._map, offset)
+            if length < RECORD_HEADER.size - 4 + sum(lengths) or offset + 4 + length > end:
+                break
+            yield offset
+            offset += 4 + length
+
+    def lookup(self, field: str, value: str):
+        """Record offsets whose field equals value, in file order"""
+        if not self.indexed:
+            return self._postings[field].get(value, [])
+        entry = self._fields[field].get(value)
+        if entry is None:
+            return []
+        first, count = entry
+        return self._offsets[first:first + count].tolist()
+
+    def query(self, since: Optional[float] = None, until: Optional[float] = None,
+              **criteria) -> Iterator[AuditRecord]:
+        """Records matching every given field value and the time range"""
+        if self.count == 0:
+            return
+        if (since is not None and self.max_ts < since) or (until is not None and self.min_ts > until):
+            return
+
+        candidates = None
+        for field, value in criteria.items():
+            if value is None:
+                continue
+            if field not in INDEXED_RECORD_FIELDS:
+                raise ValueError(f"Field is not indexed: {field}")
+            offsets = self.lookup(field, value)
+            candidates = offsets if candidates is None else \
+                sorted(set(candidates).intersection(offsets))
+            if not candidates:
+                return
+
+        if candidates is None:
+            candidates = self._all if not self.indexed else self._scan(self.records_end)
+
+        for offset in candidates:
+            record = decode_record(self._map, offset)
+            if since is not None and record[0] < since:
+                continue
+            if until is not None and record[0] > until:
+                continue
+            yield record
+
+    def close(self):
+        if self._offsets is not None:
+            self._offsets.release()
+            self._offsets = None
+        if isinstance(self._map, mmap.mmap):
+            self._map.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def list_segments(directory: str) -> List[str]:
+    """Segment files in a directory, oldest first"""
+    names = sorted(name for name in os.listdir(directory) if name.endswith(SEGMENT_SUFFIX))
+    return [os.path.join(directory, name) for name in names]
@@ -0,0 +1,109 @@
+"""
+AWAS Audit Log Query Tool
+
+Answers "what did agent X do to action Y" from binary audit segments
+written by SegmentAuditSink. Closed segments are memory-mapped and
+answered from their indexes; the segment still being written is scanned.
+
+Usage:
+    python examples/awas_audit_query.py /var/log/awas --agent Claude --action add_to_cart
+    python examples/awas_audit_query.py /var/log/awas --user u123 --since 2026-10-01 --count
+    python examples/awas_audit_query.py /var/log/awas --action checkout --replay > replay.ndjson
+"""
+
+import argparse
+import heapq
+import json
+import os
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Iterator, List, Optional
+
+from awas_audit import AuditRecord, AuditSegment, list_segments, record_to_dict
+
+
+def parse_time(value: Optional[str]) -> Optional[float]:
+    """Parse epoch seconds or an ISO 8601 timestamp (UTC unless given)"""
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+def segment_paths(paths: List[str]) -> List[str]:
+    """Expand directories into their segment files"""
+    segments = []
+    for path in paths:
+        if os.path.isdir(path):
+            segments.extend(list_segments(path))
+        else:
+            segments.append(path)
+    return segments
+
+
+def query(paths: List[str], replay: bool = False, **criteria) -> Iterator[AuditRecord]:
+    """
+    Matching records from every segment
+
+    Records come out segment by segment, or in timestamp order across
+    all segments when replay is set.
+    """
+    segments = [AuditSegment(path) for path in segment_paths(paths)]
+    try:
+        if replay:
+            # Writers timestamp on request threads, so sort within each segment
+            per_segment = [sorted(segment.query(**criteria), key=lambda r: r[0]) for segment in segments]
+            yield from heapq.merge(*per_segment, key=lambda r: r[0])
+        else:
+            for segment in segments:
+                yield from segment.query(**criteria)
+    finally:
+        for segment in segments:
+            segment.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Query binary AWAS audit segments')
+    parser.add_argument('paths', nargs='+', help='Segment files or directories')
+    parser.add_argument('--action', dest='action_id', help='Action id')
+    parser.add_argument('--agent', dest='ai_agent', help='AI agent name')
+    parser.add_argument('--user', dest='user_id', help='User id')
+    parser.add_argument('--since', help='Start time (epoch seconds or ISO 8601)')
+    parser.add_argument('--until', help='End time (epoch seconds or ISO 8601)')
+    parser.add_argument('--count', action='store_true', help='Print only the number of matches')
+    parser.add_argument('--replay', action='store_true',
+                        help='Emit matches in timestamp order across segments')
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    records = query(
+        args.paths,
+        replay=args.replay,
+        action_id=args.action_id,
+        ai_agent=args.ai_agent,
+        user_id=args.user_id,
+        since=parse_time(args.since),
+        until=parse_time(args.until)
+    )
+
+    matched = 0
+    out = sys.stdout
+    for record in records:
+        matched += 1
+        if not args.count:
+            out.write(json.dumps(record_to_dict(record), default=str) + '\n')
+
+    if args.count:
+        print(matched)
+    print(f"{matched} records in {time.perf_counter() - started:.3f}s", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
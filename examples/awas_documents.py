@@ -0,0 +1,185 @@
+"""
+AWAS Discovery Documents
+Version 1.0.0
+
+Serializes well-known discovery documents once per manifest version and
+answers conditional requests (If-None-Match / If-Modified-Since) with
+304 Not Modified without touching the body, as recommended by the
+"HTTP Caching and ETags" section of the specification.
+
+gzip and (if the `brotli` package is installed) brotli encodings are
+built at the same time and selected from Accept-Encoding per request.
+"""
+
+import gzip
+import hashlib
+import json
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Dict, Mapping, Optional, Tuple
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+DEFAULT_CACHE_CONTROL = 'public, max-age=3600, must-revalidate'
+
+# Bodies smaller than this are not worth compressing
+MIN_COMPRESS_SIZE = 256
+
+# Server preference among equally acceptable encodings
+ENCODING_PREFERENCE = ('br', 'gzip', 'identity')
+
+
+def parse_accept_encoding(header: str) -> Dict[str, float]:
+    """Map each content coding in an Accept-Encoding header to its q-value"""
+    qualities = {}
+    for part in header.split(','):
+        coding, _, params = part.partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        qualities[coding] = q
+    return qualities
+
+
+_negotiated = {}
+
+
+def negotiate_encoding(header: Optional[str], available) -> str:
+    """Pick the best available content coding for an Accept-Encoding header"""
+    if not header:
+        return 'identity'
+
+    key = (header, available)
+    encoding = _negotiated.get(key)
+    if encoding is not None:
+        return encoding
+
+    qualities = parse_accept_encoding(header)
+    wildcard = qualities.get('*')
+    best, best_q = 'identity', -1.0
+    for coding in ENCODING_PREFERENCE:
+        if coding not in available:
+            continue
+        q = qualities.get(coding)
+        if q is None:
+            # identity is acceptable unless explicitly excluded
+            q = wildcard if wildcard is not None else (1.0 if coding == 'identity' else 0.0)
+        if q > 0 and q > best_q:
+            best, best_q = coding, q
+
+    # Agents send a handful of distinct headers; keep the cache small anyway
+    if len(_negotiated) > 256:
+        _negotiated.clear()
+    _negotiated[key] = best
+    return best
+
+
+def parse_timestamp(value: Optional[str]) -> Optional[datetime]:
+    """Parse an ISO 8601 timestamp such as a manifest's lastUpdated"""
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc).replace(microsecond=0)
+
+
+class PreparedDocument:
+    """
+    A JSON document serialized once, with its HTTP validators
+
+    Usage:
+        document = PreparedDocument(manifest, last_modified=manifest.get('lastUpdated'))
+        status, headers, body = document.respond(request.headers)
+    """
+
+    def __init__(self, content: Dict, last_modified: Optional[str] = None,
+                 cache_control: str = DEFAULT_CACHE_CONTROL):
+        """
+        Initialize prepared document
+
+        Args:
+            content: JSON-serializable document
+            last_modified: ISO 8601 modification time (defaults to now)
+            cache_control: Cache-Control header value
+        """
+        self.body = json.dumps(content, ensure_ascii=False).encode('utf-8')
+        digest = hashlib.sha256(self.body).hexdigest()[:40]
+        self.etag = f'"{digest}"'
+        self.modified = parse_timestamp(last_modified) or datetime.now(timezone.utc).replace(microsecond=0)
+
+        bodies = {'identity': self.body}
+        if len(self.body) >= MIN_COMPRESS_SIZE:
+            compressed = gzip.compress(self.body, compresslevel=9, mtime=0)
+            if len(compressed) < len(self.body):
+                bodies['gzip'] = compressed
+            if brotli is not None:
+                compressed = brotli.compress(self.body, quality=11)
+                if len(compressed) < len(self.body):
+                    bodies['br'] = compressed
+
+        # Each encoding is its own representation, so it gets its own strong ETag
+        self.variants = {}
+        for encoding, body in bodies.items():
+            etag = self.etag if encoding == 'identity' else f'"{digest}-{encoding}"'
+            headers = {
+                'Content-Type': 'application/json',
+                'ETag': etag,
+                'Cache-Control': cache_control,
+                'Last-Modified': format_datetime(self.modified, usegmt=True),
+                'Vary': 'Accept-Encoding',
+            }
+            if encoding != 'identity':
+                headers['Content-Encoding'] = encoding
+            not_modified = {
+                name: value for name, value in headers.items()
+                if name not in ('Content-Type', 'Content-Encoding')
+            }
+            self.variants[encoding] = (body, headers, not_modified)
+
+        self.encodings = frozenset(self.variants)
+        self.etags = frozenset(headers['ETag'] for _, headers, _ in self.variants.values())
+        self.headers = self.variants['identity'][1]
+
+    def is_fresh(self, request_headers: Mapping[str, str]) -> bool:
+        """Check whether the client's cached copy is still current"""
+        if_none_match = request_headers.get('If-None-Match')
+        if if_none_match is not None:
+            # If-None-Match uses weak comparison and takes precedence
+            for tag in if_none_match.split(','):
+                tag = tag.strip()
+                if tag == '*' or tag.removeprefix('W/') in self.etags:
+                    return True
+            return False
+
+        if_modified_since = request_headers.get('If-Modified-Since')
+        if if_modified_since:
+            try:
+                since = parsedate_to_datetime(if_modified_since)
+            except (TypeError, ValueError):
+                return False
+            if since.tzinfo is None:
+                since = since.replace(tzinfo=timezone.utc)
+            return self.modified <= since
+        return False
+
+    def respond(self, request_headers: Mapping[str, str]) -> Tuple[int, Dict[str, str], bytes]:
+        """Status, headers and body for a GET or HEAD request"""
+        encoding = negotiate_encoding(request_headers.get('Accept-Encoding'), self.encodings)
+        body, headers, not_modified = self.variants[encoding]
+        if self.is_fresh(request_headers):
+            return 304, not_modified, b''
+        return 200, headers, body
@@ -0,0 +1,268 @@
+"""
+AWAS Condition Expressions
+Version 1.0.0
+
+A small expression language for workflow conditions, compiled once into
+nested closures so evaluation never parses text. Nothing is evaluated
+with `eval`: the grammar only allows literals, lookups into the
+namespace and the operators below, and anything else is rejected at
+compile time.
+
+    expr       := or_expr
+    or_expr    := and_expr (('or' | '||') and_expr)*
+    and_expr   := not_expr (('and' | '&&') not_expr)*
+    not_expr   := ('not' | '!') not_expr | comparison
+    comparison := operand (('==' | '!=' | '<' | '<=' | '>' | '>=' | 'in' | 'not in') operand)?
+    operand    := number | string | 'true' | 'false' | 'null'
+                | path | 'len' '(' expr ')' | '(' expr ')'
+    path       := name ('.' name | '[' integer ']')*
+
+Example: `search_products.results and len(search_products.results) > 0`
+
+A path that does not resolve is null, and comparing values of
+incompatible types is false, so a condition never raises at run time.
+"""
+
+import operator
+import re
+from typing import Callable, Dict, List, Tuple
+
+Expression = Callable[[Dict], object]
+
+# Longest expression text and deepest nesting accepted
+MAX_EXPRESSION_LENGTH = 1000
+MAX_DEPTH = 32
+
+TOKEN_PATTERN = re.compile(r'''
+    \s*(?:
+        (?P<number>\d+(?:\.\d+)?)
+      | (?P<string>'(?:[^'\\]|\\.)*'|"(?:[^"\\]|\\.)*")
+      | (?P<name>[A-Za-z_][A-Za-z0-9_]*)
+      | (?P<op>==|!=|<=|>=|&&|\|\||[<>!()\[\].])
+    )''', re.VERBOSE)
+
+ESCAPE_PATTERN = re.compile(r'\\(.)')
+
+LITERALS = {'true': True, 'false': False, 'null': None}
+KEYWORDS = frozenset(('and', 'or', 'not', 'in', 'len', *LITERALS))
+
+COMPARISONS = {
+    '==': operator.eq,
+    '!=': operator.ne,
+    '<': operator.lt,
+    '<=': operator.le,
+    '>': operator.gt,
+    '>=': operator.ge,
+}
+
+
+class ExpressionError(ValueError):
+    """Expression text outside the allowed grammar"""
+
+
+def _tokenize(text: str) -> List[Tuple[str, object]]:
+    tokens = []
+    position = 0
+    text = text.rstrip()
+    while position < len(text):
+        match = TOKEN_PATTERN.match(text, position)
+        if match is None:
+            position = len(text) - len(text[position:].lstrip())
+            raise ExpressionError(f"Unexpected character at position {position}: {text[position]!r}")
+        kind = match.lastgroup
+        value = match.group(kind)
+        if kind == 'number':
+            value = float(value) if '.' in value else int(value)
+        elif kind == 'string':
+            value = ESCAPE_PATTERN.sub(r'\1', value[1:-1])
+        elif kind == 'name' and value in KEYWORDS:
+            kind = 'keyword'
+        tokens.append((kind, value))
+        position = match.end()
+    return tokens
+
+
+def _lookup(path: Tuple) -> Expression:
+    def evaluate(namespace: Dict):
+        value = namespace
+        for part in path:
+            if isinstance(part, str):
+                if not isinstance(value, dict):
+                    return None
+                value = value.get(part)
+            else:
+                if not isinstance(value, list) or part >= len(value):
+                    return None
+                value = value[part]
+        return value
+    return evaluate
+
+
+def _compare(op: Callable, left: Expression, right: Expression) -> Expression:
+    def evaluate(namespace: Dict) -> bool:
+        try:
+            return bool(op(left(namespace), right(namespace)))
+        except TypeError:
+            return False
+    return evaluate
+
+
+def _contains(item: Expression, container: Expression, negate: bool) -> Expression:
+    def evaluate(namespace: Dict) -> bool:
+        value = container(namespace)
+        try:
+            found = isinstance(value, (list, str, dict)) and item(namespace) in value
+        except TypeError:
+            found = False
+        return found != negate
+    return evaluate
+
+
+def _length(argument: Expression) -> Expression:
+    def evaluate(namespace: Dict):
+        value = argument(namespace)
+        return len(value) if isinstance(value, (list, str, dict)) else None
+    return evaluate
+
+
+def _any(operands: List[Expression]) -> Expression:
+    def evaluate(namespace: Dict) -> bool:
+        return any(operand(namespace) for operand in operands)
+    return evaluate
+
+
+def _all(operands: List[Expression]) -> Expression:
+    def evaluate(namespace: Dict) -> bool:
+        return all(operand(namespace) for operand in operands)
+    return evaluate
+
+
+class _Parser:
+    """Recursive descent parser emitting closures"""
+
+    def __init__(self, tokens: List[Tuple[str, object]]):
+        self.tokens = tokens
+        self.position = 0
+        self.depth = 0
+
+    def peek(self, offset: int = 0) -> Tuple[str, object]:
+        index = self.position + offset
+        return self.tokens[index] if index < len(self.tokens) else ('end', None)
+
+    def accept(self, *values) -> bool:
+        kind, value = self.peek()
+        if kind in ('op', 'keyword') and value in values:
+            self.position += 1
+            return True
+        return False
+
+    def expect(self, value: str):
+        if not self.accept(value):
+            raise ExpressionError(f"Expected {value!r}, found {self.peek()[1]!r}")
+
+    def parse(self) -> Expression:
+        expression = self.or_expr()
+        if self.position != len(self.tokens):
+            raise ExpressionError(f"Unexpected token: {self.peek()[1]!r}")
+        return expression
+
+    def or_expr(self) -> Expression:
+        operands = [self.and_expr()]
+        while self.accept('or', '||'):
+            operands.append(self.and_expr())
+        return operands[0] if len(operands) == 1 else _any(operands)
+
+    def and_expr(self) -> Expression:
+        operands = [self.not_expr()]
+        while self.accept('and', '&&'):
+            operands.append(self.not_expr())
+        return operands[0] if len(operands) == 1 else _all(operands)
+
+    def not_expr(self) -> Expression:
+        if self.accept('not', '!'):
+            self.nest()
+            operand = self.not_expr()
+            self.depth -= 1
+            return lambda namespace: not operand(namespace)
+        return self.comparison()
+
+    def comparison(self) -> Expression:
+        left = self.operand()
+        kind, value = self.peek()
+        if kind == 'op' and value in COMPARISONS:
+            self.position += 1
+            return _compare(COMPARISONS[value], left, self.operand())
+        if self.accept('in'):
+            return _contains(left, self.operand(), negate=False)
+        if self.peek() == ('keyword', 'not') and self.peek(1) == ('keyword', 'in'):
+            self.position += 2
+            return _contains(left, self.operand(), negate=True)
+        return left
+
+    def operand(self) -> Expression:
+        kind, value = self.peek()
+        if kind in ('number', 'string'):
+            self.position += 1
+            return lambda namespace: value
+        if kind == 'keyword' and value in LITERALS:
+            self.position += 1
+            literal = LITERALS[value]
+            return lambda namespace: literal
+        if self.accept('len'):
+            self.expect('(')
+            self.nest()
+            argument = self.or_expr()
+            self.depth -= 1
+            self.expect(')')
+            return _length(argument)
+        if self.accept('('):
+            self.nest()
+            expression = self.or_expr()
+            self.depth -= 1
+            self.expect(')')
+            return expression
+        if kind == 'name':
+            return self.path()
+        raise ExpressionError(f"Unexpected token: {value!r}" if kind != 'end' else "Unexpected end of expression")
+
+    def path(self) -> Expression:
+        parts = [self.peek()[1]]
+        self.position += 1
+        while True:
+            if self.accept('.'):
+                kind, value = self.peek()
+                if kind not in ('name', 'keyword'):
+                    raise ExpressionError(f"Expected a name after '.', found {value!r}")
+                parts.append(value)
+                self.position += 1
+            elif self.accept('['):
+                kind, value = self.peek()
+                if kind != 'number' or not isinstance(value, int):
+                    raise ExpressionError(f"Expected an integer index, found {value!r}")
+                parts.append(value)
+                self.position += 1
+                self.expect(']')
+            else:
+                return _lookup(tuple(parts))
+
+    def nest(self):
+        self.depth += 1
+        if self.depth > MAX_DEPTH:
+            raise ExpressionError(f"Expression nested deeper than {MAX_DEPTH} levels")
+
+
+_expression_cache = {}
+
+
+def compile_expression(text: str) -> Expression:
+    """Compile expression text, reusing the result for identical text"""
+    if not isinstance(text, str) or not text.strip():
+        raise ExpressionError("Expression must be a non-empty string")
+    compiled = _expression_cache.get(text)
+    if compiled is not None:
+        return compiled
+
+    if len(text) > MAX_EXPRESSION_LENGTH:
+        raise ExpressionError(f"Expression longer than {MAX_EXPRESSION_LENGTH} characters")
+    compiled = _Parser(_tokenize(text)).parse()
+    return _expression_cache.setdefault(text, compiled)
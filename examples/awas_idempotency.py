@@ -0,0 +1,205 @@
+"""
+AWAS Idempotency Keys
+Version 1.0.0
+
+Stores the first response to each (client, caller identity, action,
+Idempotency-Key) so retries of a write action are answered from memory
+instead of running the handler again. Entries expire after a TTL and the
+cache evicts least recently used entries to stay within a byte budget.
+
+SingleFlight lets a duplicate that arrives while the first execution is
+still running wait for that execution's result instead of running again.
+"""
+
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from typing import Dict, Hashable, List, Optional, Tuple
+
+# Rough per-entry bookkeeping cost on top of the stored bytes
+ENTRY_OVERHEAD = 256
+
+# Longest Idempotency-Key value accepted
+MAX_KEY_LENGTH = 255
+
+
+def fingerprint(params: Dict) -> str:
+    """Stable digest of request parameters, to detect a key reused for a different request"""
+    canonical = json.dumps(params, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+class StoredResponse:
+    """Status, headers and body of a completed action"""
+
+    __slots__ = ('status', 'headers', 'body', 'fingerprint', 'expires', 'size')
+
+    def __init__(self, status: int, headers: List[Tuple[str, str]], body: bytes,
+                 fingerprint: str, expires: float):
+        self.status = status
+        self.headers = headers
+        self.body = body
+        self.fingerprint = fingerprint
+        self.expires = expires
+        self.size = ENTRY_OVERHEAD + len(body) + sum(len(k) + len(v) for k, v in headers)
+
+
+class IdempotencyCache:
+    """
+    TTL and memory-bounded store of responses keyed by idempotency key
+
+    Usage:
+        cache = IdempotencyCache(ttl=86400, max_bytes=32 * 1024 * 1024)
+        awas = AWASMiddleware(app, idempotency_cache=cache)
+    """
+
+    def __init__(self, ttl: float = 86400, max_bytes: int = 16 * 1024 * 1024):
+        """
+        Initialize idempotency cache
+
+        Args:
+            ttl: Seconds a stored response is replayed for
+            max_bytes: Approximate memory budget for stored responses
+        """
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evicted = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, now: float) -> Optional[StoredResponse]:
+        """Return the stored response for a key, if any"""
+        with self._lock:
+            self._expire(now)
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires <= now:
+                # Expired behind a more recently used entry
+                del self._entries[key]
+                self.bytes -= entry.size
+                self.expired += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def entry(self, status: int, headers: List[Tuple[str, str]], body: bytes,
+              params_fingerprint: str, now: float) -> StoredResponse:
+        """Build an entry expiring after this cache's TTL"""
+        return StoredResponse(status, headers, body, params_fingerprint, now + self.ttl)
+
+    def put(self, key: Hashable, entry: StoredResponse) -> bool:
+        """Store a response; returns False if it is too large for the budget"""
+        if entry.size > self.max_bytes:
+            return False
+
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.bytes -= previous.size
+            self._entries[key] = entry
+            self.bytes += entry.size
+
+            while self.bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.bytes -= evicted.size
+                self.evicted += 1
+        return True
+
+    def _expire(self, now: float):
+        """Drop expired entries from the least recently used end"""
+        entries = self._entries
+        while entries:
+            key, entry = next(iter(entries.items()))
+            if entry.expires > now:
+                break
+            del entries[key]
+            self.bytes -= entry.size
+            self.expired += 1
+
+    def stats(self) -> Dict:
+        """Report cache size and counters"""
+        return {
+            'entries': len(self._entries),
+            'bytes': self.bytes,
+            'max_bytes': self.max_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'expired': self.expired,
+            'evicted': self.evicted
+        }
+
+
+class Flight:
+    """One in-progress execution that duplicates can wait on"""
+
+    __slots__ = ('done', 'result', 'waiters')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent executions that share a key
+
+    Usage:
+        flight, leader = flights.begin(key)
+        if leader:
+            try:
+                result = run()
+            finally:
+                flights.finish(key, flight, result)
+        else:
+            result = flights.wait(flight, timeout=10)
+    """
+
+    def __init__(self):
+        self.coalesced = 0
+        self.timeouts = 0
+        self._flights = {}
+        self._lock = threading.Lock()
+
+    def begin(self, key: Hashable) -> Tuple[Flight, bool]:
+        """Join the flight for a key, or start one; the second value is True for the leader"""
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is not None:
+                flight.waiters += 1
+                self.coalesced += 1
+                return flight, False
+            flight = self._flights[key] = Flight()
+            return flight, True
+
+    def wait(self, flight: Flight, timeout: Optional[float]):
+        """Wait for the leader's result; raises TimeoutError if it does not finish in time"""
+        if not flight.done.wait(timeout):
+            with self._lock:
+                self.timeouts += 1
+            raise TimeoutError("In-flight execution did not finish in time")
+        return flight.result
+
+    def finish(self, key: Hashable, flight: Flight, result):
+        """Publish the leader's result (None if it failed) and wake waiters"""
+        with self._lock:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+        flight.result = result
+        flight.done.set()
+
+    def stats(self) -> Dict:
+        """Report in-flight executions and coalescing counters"""
+        return {
+            'in_flight': len(self._flights),
+            'coalesced': self.coalesced,
+            'timeouts': self.timeouts
+        }
@@ -0,0 +1,353 @@
+"""
+AWAS Compiled Manifest
+Version 1.0.0
+
+Everything derived from one version of the AI action manifest (action
+registry, input validators, rate limiters and serialized discovery
+documents) is built into a single immutable CompiledManifest. Servers
+hold one reference to it, so a reload is a single atomic swap and
+in-flight requests keep using the version they started with.
+"""
+
+import json
+import logging
+import os
+import threading
+from typing import Callable, Dict, List, Optional, Union
+
+from awas_documents import DEFAULT_CACHE_CONTROL, PreparedDocument
+from awas_registry import ActionRegistry
+from awas_ratelimit import (
+    InProcessBackend, RateLimitBackend, RateLimitEngine, parse_rate_limit_hint, parse_window
+)
+from awas_validation import ActionValidator
+from awas_workflow import compile_workflows
+
+logger = logging.getLogger(__name__)
+
+SITEMAP_PATH = '/.well-known/ai-sitemap.json'
+
+
+def read_manifest(path: str) -> Dict:
+    """Read and parse a manifest file, raising on missing or invalid files"""
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+class CompiledManifest:
+    """
+    Immutable bundle of a manifest and the structures compiled from it
+
+    Usage:
+        compiled = CompiledManifest(read_manifest('.well-known/ai-actions.json'))
+        action = compiled.registry.get('add_to_cart')
+        errors = compiled.input_validators['add_to_cart'](params)
+    """
+
+    def __init__(self, manifest: Dict, rate_limit_algorithm: str = 'sliding_window',
+                 rate_limit_max_clients: int = 10000,
+                 cache_control: str = DEFAULT_CACHE_CONTROL,
+                 sitemap_pages: Optional[Union[List[Dict], Callable[[], List[Dict]]]] = None,
+                 audit_logging: bool = True,
+                 previous: Optional['CompiledManifest'] = None,
+                 mtime: Optional[float] = None,
+                 rate_limit_backend: Optional[RateLimitBackend] = None):
+        """
+        Compile a manifest
+
+        Args:
+            manifest: Parsed manifest
+            rate_limit_algorithm: 'sliding_window' or 'token_bucket'
+            rate_limit_max_clients: Maximum clients tracked per action limiter
+            cache_control: Cache-Control header for discovery documents
+            sitemap_pages: Pages listed in the AI sitemap, or a function returning them
+                (called on first use, so it sees routes registered after compiling)
+            audit_logging: Whether audit logging is advertised as a feature
+            previous: Earlier version whose unchanged limiters (and their state) are kept
+            mtime: Modification time of the manifest file
+            rate_limit_backend: Backend whose storage per-action limits share (default: in-process)
+        """
+        self.manifest = manifest
+        self.mtime = mtime
+        self.registry = ActionRegistry(manifest)
+        self.input_validators = {action['id']: ActionValidator(action) for action in self.registry}
+
+        rate_limits = manifest.get('rate_limits', {})
+        if previous is not None and previous.manifest.get('rate_limits', {}) == rate_limits \
+                and previous.rate_limiter.algorithm == rate_limit_algorithm:
+            self.rate_limiter = previous.rate_limiter
+        else:
+            self.rate_limiter = RateLimitEngine.from_manifest(rate_limits, algorithm=rate_limit_algorithm)
+
+        self.action_rate_limits = self._build_action_rate_limits(
+            rate_limit_algorithm, rate_limit_max_clients, previous,
+            rate_limit_backend or InProcessBackend(max_entries=rate_limit_max_clients)
+        )
+        self.cache_ttls = self._build_cache_ttls()
+        self.workflows = compile_workflows(
+            manifest.get('workflows', []), self.registry,
+            lambda definition, e: logger.warning(f"Ignoring workflow {definition.get('id')}: {e}")
+        )
+
+        last_updated = manifest.get('lastUpdated')
+        self.manifest_document = PreparedDocument(
+            manifest, last_modified=last_updated, cache_control=cache_control
+        )
+        self._sitemap_pages = sitemap_pages
+        self._sitemap_document = None
+        self._sitemap_lock = threading.Lock()
+        self._last_updated = last_updated
+        self._cache_control = cache_control
+        self.capabilities_document = PreparedDocument({
+            "version": "1.0",
+            "supported_protocols": ["HTTP/1.1", "HTTP/2"],
+            "auth_methods": manifest.get("authentication", {}).get("methods", []),
+            "rate_limits": rate_limits,
+            "features": [
+                "structured_actions",
+                "workflow_support",
+                "audit_logging" if audit_logging else None
+            ]
+        }, last_modified=last_updated, cache_control=cache_control)
+
+        # Discovery documents by well-known path (the sitemap is built on first use)
+        self.documents = {
+            '/.well-known/ai-actions.json': self.manifest_document,
+            '/.well-known/ai-capabilities': self.capabilities_document,
+        }
+
+    @property
+    def sitemap_document(self) -> PreparedDocument:
+        """AI sitemap, built once per manifest version on first use"""
+        document = self._sitemap_document
+        if document is None:
+            with self._sitemap_lock:
+                document = self._sitemap_document
+                if document is None:
+                    pages = self._sitemap_pages
+                    if callable(pages):
+                        pages = pages()
+                    document = self._sitemap_document = PreparedDocument({
+                        "version": "1.0",
+                        "pages": pages or []
+                    }, last_modified=self._last_updated, cache_control=self._cache_control)
+        return document
+
+    def document(self, path: str) -> Optional[PreparedDocument]:
+        """Discovery document served at a well-known path, if any"""
+        if path == SITEMAP_PATH:
+            return self.sitemap_document
+        return self.documents.get(path)
+
+    def _build_action_rate_limits(self, algorithm: str, max_clients: int,
+                                  previous: Optional['CompiledManifest'],
+                                  shared: RateLimitBackend) -> Dict[str, RateLimitBackend]:
+        """Preallocate a limiter in the shared backend for each action with a rateLimitHint"""
+        action_rate_limits = {}
+        for action in self.registry:
+            hint = action.get('rateLimitHint')
+            if not hint:
+                continue
+            try:
+                requests_allowed, window = parse_rate_limit_hint(hint)
+            except ValueError as e:
+                logger.warning(f"Ignoring rateLimitHint for action {action.get('id')}: {e}")
+                continue
+
+            # Keep the existing limiter, and its client state, if the hint is unchanged
+            existing = previous and previous.action_rate_limits.get(action['id'])
+            if existing is not None:
+                _, limiter, _ = existing.engine.limits[0]
+                if (limiter.limit, limiter.window, existing.engine.algorithm) == \
+                        (requests_allowed, window, algorithm):
+                    action_rate_limits[action['id']] = existing
+                    continue
+
+            engine = RateLimitEngine([('action', requests_allowed, window)], algorithm=algorithm)
+            backend = shared.for_action(action['id'], max_clients)
+            try:
+                backend.bind(engine)
+            except ValueError as e:
+                logger.warning(f"Ignoring rateLimitHint for action {action['id']}: {e}")
+                continue
+            action_rate_limits[action['id']] = backend
+        return action_rate_limits
+
+
+    def _build_cache_ttls(self) -> Dict[str, Optional[float]]:
+        """Declared cacheTtl (None if absent) of each safe read action"""
+        cache_ttls = {}
+        for action in self.registry.find(intent='read', sideEffect='safe'):
+            ttl = action.get('cacheTtl')
+            if ttl is not None:
+                try:
+                    ttl = float(ttl) if isinstance(ttl, (int, float)) else parse_window(ttl)
+                except ValueError:
+                    logger.warning(f"Ignoring cacheTtl for action {action['id']}: {ttl!r}")
+                    continue
+            cache_ttls[action['id']] = ttl
+        return cache_ttls
+
+
+class ManifestWatcher:
+    """
+    Polls a manifest file's modification time and calls back on change
+
+    Polling runs on a daemon thread, so requests never pay for the check
+    or the rebuild.
+    """
+
+    def __init__(self, path: str, on_change: Callable[[], None], interval: float = 2.0):
+        """
+        Initialize manifest watcher
+
+        Args:
+            path: Manifest file to watch
+            on_change: Called from the watcher thread when the file changes
+            interval: Seconds between checks
+        """
+        self.path = path
+        self.on_change = on_change
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+        self._last = self._stat()
+
+    def _stat(self):
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='awas-manifest-watcher', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            current = self._stat()
+            if current is None or current == self._last:
+                continue
+            self._last = current
+            try:
+                self.on_change()
+            except Exception:
+                logger.exception(f"Manifest reload failed: {self.path}")
+
+
+class ManifestHost:
+    """
+    Owns the current CompiledManifest for a server integration
+
+    Shared by the Flask and ASGI middleware: loads and compiles the
+    manifest, binds the rate limit backend, and swaps in recompiled
+    versions on reload. Subclasses call _init_manifest() from __init__.
+    """
+
+    enable_logging = True
+
+    def _init_manifest(self, manifest_path: str, rate_limit_backend: Optional[RateLimitBackend],
+                       rate_limit_algorithm: str, rate_limit_max_clients: int,
+                       manifest_cache_control: str):
+        """Compile the manifest and bind the rate limit backend"""
+        self.manifest_path = manifest_path
+        self.rate_limit_algorithm = rate_limit_algorithm
+        self.rate_limit_max_clients = rate_limit_max_clients
+        self.manifest_cache_control = manifest_cache_control
+        self._reload_lock = threading.Lock()
+
+        self.rate_limit_backend = rate_limit_backend or InProcessBackend(
+            max_entries=rate_limit_max_clients
+        )
+        self.compiled = self._compile_manifest(self._load_manifest())
+        self.rate_limit_backend.bind(self.compiled.rate_limiter)
+        self.watcher = None
+
+    def _start_watcher(self, reload_interval: Optional[float]):
+        """Poll the manifest file for changes (None disables hot reload)"""
+        if reload_interval:
+            self.watcher = ManifestWatcher(self.manifest_path, self.reload_manifest, reload_interval)
+            self.watcher.start()
+
+    # Views of the current compiled manifest, kept for existing callers
+    manifest = property(lambda self: self.compiled.manifest)
+    registry = property(lambda self: self.compiled.registry)
+    rate_limiter = property(lambda self: self.compiled.rate_limiter)
+    action_rate_limits = property(lambda self: self.compiled.action_rate_limits)
+    input_validators = property(lambda self: self.compiled.input_validators)
+
+    def _load_manifest(self) -> Dict:
+        """Load the AI action manifest"""
+        try:
+            return read_manifest(self.manifest_path)
+        except FileNotFoundError:
+            logger.warning(f"Manifest file not found: {self.manifest_path}")
+            return {"version": "1.0", "actions": []}
+        except json.JSONDecodeError as e:
+            logger.error(f"Invalid JSON in manifest: {e}")
+            return {"version": "1.0", "actions": []}
+
+    def _compile_manifest(self, manifest: Dict,
+                          previous: Optional[CompiledManifest] = None) -> CompiledManifest:
+        """Build the registry, validators, limiters and documents for a manifest"""
+        try:
+            mtime = os.path.getmtime(self.manifest_path)
+        except OSError:
+            mtime = None
+        return CompiledManifest(
+            manifest,
+            rate_limit_algorithm=self.rate_limit_algorithm,
+            rate_limit_max_clients=self.rate_limit_max_clients,
+            cache_control=self.manifest_cache_control,
+            sitemap_pages=self._generate_sitemap,
+            audit_logging=self.enable_logging,
+            previous=previous,
+            mtime=mtime,
+            rate_limit_backend=self.rate_limit_backend
+        )
+
+    def reload_manifest(self) -> bool:
+        """
+        Re-read the manifest and atomically swap in a freshly compiled version
+
+        Requests already running keep the version they started with. If the
+        file is missing or invalid, the current version stays in place.
+
+        Returns:
+            True if a new manifest was loaded
+        """
+        with self._reload_lock:
+            try:
+                manifest = read_manifest(self.manifest_path)
+            except (OSError, json.JSONDecodeError) as e:
+                logger.error(f"Manifest reload skipped, keeping current version: {e}")
+                return False
+
+            current = self.compiled
+            compiled = self._compile_manifest(manifest, previous=current)
+            if compiled.rate_limiter is not current.rate_limiter:
+                try:
+                    self.rate_limit_backend.bind(compiled.rate_limiter)
+                except ValueError as e:
+                    logger.error(f"Keeping previous rate limits: {e}")
+                    compiled.rate_limiter = current.rate_limiter
+
+            self.compiled = compiled
+
+        logger.info(f"AWAS manifest reloaded: {len(compiled.registry)} actions")
+        return True
+
+    def _generate_sitemap(self) -> List[Dict]:
+        """
+        Generate AI sitemap from routes (override this method)
+
+        Called on the first sitemap request after each manifest load, once
+        the application has registered its routes.
+        """
+        return []
@@ -5,22 +5,53 @@ Version 1.0.0
 Provides server-side support for AWAS (AI Web Action Standard)
 """
 
-from flask import Flask, request, jsonify, g, send_from_directory
-from functools import wraps
+from flask import (
+    Flask, Response, request, jsonify, g, make_response, send_from_directory,
+    copy_current_request_context
+)
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import partial, wraps
+import hashlib
 import json
+import math
 import time
 import logging
-from typing import Dict, List, Optional, Callable
+from typing import Dict, List, Optional, Callable, Tuple
 from datetime import datetime
 
+from awas_audit import AuditSink, snapshot
+from awas_documents import DEFAULT_CACHE_CONTROL, PreparedDocument
+from awas_idempotency import MAX_KEY_LENGTH, IdempotencyCache, SingleFlight, fingerprint
+from awas_manifest import CompiledManifest, ManifestHost
+from awas_ratelimit import RATE_LIMIT_ERRORS, RateLimitBackend
+from awas_preview import DRY_RUN_HEADER, PREVIEW_TOKEN_HEADER, InvalidPreviewToken, PreviewCache
+from awas_response_cache import CachedResponse, ResponseCache, cache_control_ttl
+from awas_validation import ActionValidator
+
 logger = logging.getLogger(__name__)
 
+# Request bookkeeping on g that tasks run with a copied context must not inherit
+REQUEST_ONLY_STATE = frozenset(('awas_rate_limit_client',))
+
 
-class AWASMiddleware:
+class AWASMiddleware(ManifestHost):
     """Middleware to handle AWAS requests in Flask applications"""
 
     def __init__(self, app: Flask, manifest_path: str = '.well-known/ai-actions.json',
-                 enable_rate_limiting: bool = True, enable_logging: bool = True):
+                 enable_rate_limiting: bool = True, enable_logging: bool = True,
+                 rate_limit_algorithm: str = 'sliding_window',
+                 rate_limit_max_clients: int = 10000,
+                 rate_limit_backend: Optional[RateLimitBackend] = None,
+                 manifest_cache_control: str = DEFAULT_CACHE_CONTROL,
+                 reload_interval: Optional[float] = None,
+                 audit_sink: Optional[AuditSink] = None,
+                 idempotency_cache: Optional[IdempotencyCache] = None,
+                 idempotency_wait_timeout: float = 10.0,
+                 response_cache: Optional[ResponseCache] = None,
+                 preview_cache: Optional[PreviewCache] = None,
+                 dispatch_prefix: Optional[str] = '/api/ai-actions',
+                 batch_max_items: int = 50,
+                 batch_workers: int = 8):
         """
         Initialize AWAS middleware
 
@@ -29,34 +60,61 @@ class AWASMiddleware:
             manifest_path: Path to AI actions manifest
             enable_rate_limiting: Enable rate limiting for AI agents
             enable_logging: Enable audit logging
+            rate_limit_algorithm: 'sliding_window' or 'token_bucket'
+            rate_limit_max_clients: Maximum number of clients tracked for rate limiting
+            rate_limit_backend: Where rate limit state is kept (default: in-process)
+            manifest_cache_control: Cache-Control header for the manifest
+            reload_interval: Seconds between manifest change checks (None disables hot reload)
+            audit_sink: Where audit records are queued (default: synchronous logger output)
+            idempotency_cache: Stored responses for Idempotency-Key retries
+            idempotency_wait_timeout: Seconds a duplicate waits for the in-flight original
+            response_cache: Cache for safe read actions (None disables response caching);
+                authenticated reads are cached per _caller_identity() and not at all
+                when it returns None
+            preview_cache: Dry-run plans kept for the commit that follows
+            dispatch_prefix: Route prefix of the generic action dispatcher (None disables it)
+            batch_max_items: Maximum actions in one batch request
+            batch_workers: Threads running batch safe reads and workflow steps
         """
         self.app = app
-        self.manifest_path = manifest_path
         self.enable_rate_limiting = enable_rate_limiting
         self.enable_logging = enable_logging
-        self.manifest = self._load_manifest()
-        self.rate_limit_store = {}
+        self.audit_sink = audit_sink
+        self.idempotency_cache = idempotency_cache or IdempotencyCache()
+        self.idempotency_flights = SingleFlight()
+        self.idempotency_wait_timeout = idempotency_wait_timeout
+        self.response_cache = response_cache
+        self.preview_cache = preview_cache or PreviewCache()
+        self.planners = {}
+        self._init_manifest(manifest_path, rate_limit_backend, rate_limit_algorithm,
+                            rate_limit_max_clients, manifest_cache_control)
+
+        # Handlers for the generic dispatch route, already wrapped by validate_action
+        self.handlers = {}
+        self._dispatch_table = {}
+        self.batch_max_items = batch_max_items
+        self._batch_pool = ThreadPoolExecutor(max_workers=batch_workers,
+                                              thread_name_prefix='awas-batch')
 
         # Register well-known routes
         self._register_routes()
+        if dispatch_prefix:
+            app.add_url_rule(f'{dispatch_prefix}/batch', 'awas_batch', self._dispatch_batch,
+                             methods=['POST'])
+            app.add_url_rule(f'{dispatch_prefix}/workflows/<workflow_id>', 'awas_workflow',
+                             self._dispatch_workflow, methods=['POST'])
+            app.add_url_rule(f'{dispatch_prefix}/<action_id>', 'awas_dispatch', self._dispatch,
+                             methods=['GET', 'POST', 'PUT', 'PATCH', 'DELETE'])
 
         # Register before_request handler
         if enable_rate_limiting:
             app.before_request(self._check_rate_limit)
+            app.after_request(self._add_rate_limit_headers)
+            app.teardown_request(self._release_rate_limit)
 
-        logger.info("AWAS Middleware initialized")
+        self._start_watcher(reload_interval)
 
-    def _load_manifest(self) -> Dict:
-        """Load the AI action manifest"""
-        try:
-            with open(self.manifest_path, 'r') as f:
-                return json.load(f)
-        except FileNotFoundError:
-            logger.warning(f"Manifest file not found: {self.manifest_path}")
-            return {"version": "1.0", "actions": []}
-        except json.JSONDecodeError as e:
-            logger.error(f"Invalid JSON in manifest: {e}")
-            return {"version": "1.0", "actions": []}
+        logger.info("AWAS Middleware initialized")
 
     def _register_routes(self):
         """Register well-known routes for AI discovery"""
@@ -64,34 +122,281 @@ class AWASMiddleware:
         @self.app.route('/.well-known/ai-actions.json')
         def ai_actions_manifest():
             """Serve the AI action manifest"""
-            return jsonify(self.manifest)
+            return self._serve_document(self.compiled.manifest_document)
 
         @self.app.route('/.well-known/ai-sitemap.json')
         def ai_sitemap():
             """Serve AI sitemap (optional, customize as needed)"""
-            return jsonify({
-                "version": "1.0",
-                "pages": self._generate_sitemap()
-            })
+            return self._serve_document(self.compiled.sitemap_document)
 
         @self.app.route('/.well-known/ai-capabilities')
         def ai_capabilities():
             """Expose AI capabilities"""
+            return self._serve_document(self.compiled.capabilities_document)
+
+    def handler(self, action_id: str) -> Callable:
+        """
+        Register the handler called for an action by the dispatch route
+
+        The handler receives the validated parameters, with declared
+        defaults applied, and returns a Flask response value.
+
+        Usage:
+            @awas.handler('search_products')
+            def search_products(params):
+                return jsonify({"results": []}), 200
+        """
+        def decorator(f):
+            @wraps(f)
+            def call_handler():
+                return f(g.awas_params)
+
+            self.handlers[action_id] = f
+            self._dispatch_table[action_id] = self.validate_action(action_id)(call_handler)
+            return f
+        return decorator
+
+    def _dispatch(self, action_id: str):
+        """Generic action route: look up the wrapped handler and run it"""
+        view = self._dispatch_table.get(action_id)
+        action = self.compiled.registry.get(action_id)
+        if view is None or action is None:
             return jsonify({
-                "version": "1.0",
-                "supported_protocols": ["HTTP/1.1", "HTTP/2"],
-                "auth_methods": self.manifest.get("authentication", {}).get("methods", []),
-                "rate_limits": self.manifest.get("rate_limits", {}),
-                "features": [
-                    "structured_actions",
-                    "workflow_support",
-                    "audit_logging" if self.enable_logging else None
-                ]
+                "error": f"Unknown action: {action_id}"
+            }), 404
+
+        # Only the declared method, so a cross-site GET cannot trigger a write
+        method = (action.get('method') or 'GET').upper()
+        if request.method != method and not (request.method == 'HEAD' and method == 'GET'):
+            response = jsonify({
+                "error": f"Method {request.method} not allowed for action: {action_id}"
             })
+            response.headers['Allow'] = method
+            return response, 405
+        return view()
+
+    def _batch_items(self) -> Optional[List]:
+        """Entries of a batch request: a JSON array or {"actions": [...]}"""
+        body = request.get_json(silent=True)
+        if isinstance(body, dict):
+            body = body.get('actions')
+        return body if isinstance(body, list) else None
+
+    def _request_cost(self) -> int:
+        """Rate limit charge for the current request"""
+        if request.endpoint == 'awas_batch':
+            items = self._batch_items()
+            if items:
+                return min(len(items), self.batch_max_items)
+        elif request.endpoint == 'awas_workflow':
+            workflow = self.compiled.workflows.get(request.view_args.get('workflow_id'))
+            if workflow is not None:
+                return workflow.size
+        return 1
+
+    def _dispatch_batch(self):
+        """
+        Run several actions in one request
+
+        Every entry is checked before any runs. Safe reads then run
+        concurrently on the batch thread pool while other actions run in
+        order on the request thread.
+        """
+        compiled = self.compiled
+        g.awas_compiled = compiled
+
+        if request.headers.get(DRY_RUN_HEADER) == 'true':
+            return jsonify({
+                "error": "Dry run not supported for batches"
+            }), 400
+
+        items = self._batch_items()
+        if items is None:
+            return jsonify({
+                "error": "Batch must be a JSON array of {action_id, params}"
+            }), 400
+        if len(items) > self.batch_max_items:
+            return jsonify({
+                "error": f"Batch exceeds {self.batch_max_items} actions"
+            }), 400
+
+        # Validate all entries up front
+        plan = []
+        errors = []
+        for index, item in enumerate(items):
+            item = item if isinstance(item, dict) else {}
+            action_id = item.get('action_id')
+            params = item.get('params', {})
+            action = compiled.registry.get(action_id)
+            if action is None or action_id not in self.handlers:
+                errors.append({"index": index, "error": f"Unknown action: {action_id}"})
+            elif action.get('authentication_required', False) and not self._check_authentication():
+                errors.append({"index": index, "error": "Authentication required"})
+            elif not isinstance(params, dict):
+                errors.append({"index": index, "error": "Validation failed",
+                               "details": ["Request parameters must be of type object"]})
+            else:
+                validator = compiled.input_validators[action_id]
+                details = validator(params)
+                if details:
+                    errors.append({"index": index, "error": "Validation failed", "details": details})
+                else:
+                    plan.append((index, action, validator.apply_defaults(params)))
+
+        if errors:
+            return jsonify({
+                "error": "Batch validation failed",
+                "items": errors
+            }), 400
+
+        # Per-action rate limit hints, charged once per action for all its entries
+        if self.enable_rate_limiting and self._is_ai_agent():
+            counts = {}
+            for _, action, _ in plan:
+                counts[action['id']] = counts.get(action['id'], 0) + 1
+            client_id = self._get_client_id()
+            for action_id, count in counts.items():
+                action_limit = compiled.action_rate_limits.get(action_id)
+                decision = action_limit and action_limit.hit(client_id, time.time(), count)
+                if decision and decision.exceeded:
+                    g.awas_rate_limit = decision
+                    return jsonify({
+                        "error": f"Rate limit exceeded for action: {action_id}",
+                        "retry_after": math.ceil(decision.retry_after)
+                    }), 429
+
+        if self.enable_logging:
+            for _, action, params in plan:
+                self._log_action(action['id'], params)
+
+        results = [None] * len(plan)
+        futures = []
+        for position, (index, action, params) in enumerate(plan):
+            if action.get('intent') == 'read' and action.get('sideEffect') == 'safe':
+                futures.append((position, self._submit(self._run_batch_item, index, action, params)))
+            else:
+                results[position] = self._run_batch_item(index, action, params)
+        for position, future in futures:
+            results[position] = future.result()
+
+        return jsonify({"results": results}), 200
+
+    def _submit(self, fn: Callable, *args) -> Future:
+        """Run fn on the batch pool with a copy of the current request context and g"""
+        # The concurrent request slot belongs to the outer request: a copy
+        # would be released again when the copied context tears down
+        state = {name: value for name, value in g.__dict__.items()
+                 if name not in REQUEST_ONLY_STATE}
+
+        @copy_current_request_context
+        def run():
+            g.__dict__.update(state)
+            return fn(*args)
+        return self._batch_pool.submit(run)
+
+    def _run_batch_item(self, index: int, action: Dict, params: Dict) -> Dict:
+        """Call an action's handler and summarize its response"""
+        status, body = self._call_handler(action['id'], params)
+        return {"index": index, "action_id": action['id'], "status": status, "body": body}
+
+    def _call_handler(self, action_id: str, params: Dict) -> Tuple[int, object]:
+        """Call a registered handler, returning its status and decoded body"""
+        g.awas_params = params
+        try:
+            response = make_response(self.handlers[action_id](params))
+        except Exception:
+            logger.exception(f"Action failed: {action_id}")
+            return 500, {"error": "Action failed"}
+
+        body = response.get_json(silent=True)
+        if body is None:
+            body = response.get_data(as_text=True)
+        return response.status_code, body
+
+    def _dispatch_workflow(self, workflow_id: str):
+        """
+        Run a manifest workflow in one request
+
+        The body may give workflow-wide `inputs` and per-action `params`.
+        Returns every step's result; a failed step's status becomes the
+        response status.
+        """
+        compiled = self.compiled
+        g.awas_compiled = compiled
+
+        workflow = compiled.workflows.get(workflow_id)
+        if workflow is None:
+            return jsonify({
+                "error": f"Unknown workflow: {workflow_id}"
+            }), 404
+
+        if request.headers.get(DRY_RUN_HEADER) == 'true':
+            return jsonify({
+                "error": "Dry run not supported for workflows"
+            }), 400
+
+        body = request.get_json(silent=True) or {}
+        inputs = body.get('inputs', {}) if isinstance(body, dict) else None
+        params = body.get('params', {}) if isinstance(body, dict) else None
+        if not isinstance(inputs, dict) or not isinstance(params, dict) \
+                or not all(isinstance(value, dict) for value in params.values()):
+            return jsonify({
+                "error": "Workflow body must be {\"inputs\": {...}, \"params\": {action_id: {...}}}"
+            }), 400
+
+        missing = sorted(workflow.action_ids.difference(self.handlers))
+        if missing:
+            return jsonify({
+                "error": f"No handler registered for: {', '.join(missing)}"
+            }), 501
+
+        # Check authentication once for every action the workflow can call
+        if any(compiled.registry.get(action_id).get('authentication_required', False)
+               for action_id in workflow.action_ids) and not self._check_authentication():
+            return jsonify({
+                "error": "Authentication required"
+            }), 401
+
+        results, failure = workflow.run(
+            partial(self._run_workflow_step, compiled), inputs, params, self._submit
+        )
+        return jsonify({
+            "workflow_id": workflow_id,
+            "status": "failed" if failure else "completed",
+            "steps": results
+        }), failure['status'] if failure else 200
+
+    def _run_workflow_step(self, compiled: CompiledManifest, action_id: str,
+                           params: Dict) -> Tuple[int, object]:
+        """Check limits and inputs for one workflow step, then call its handler"""
+        g.awas_compiled = compiled
+
+        if self.enable_rate_limiting and self._is_ai_agent():
+            action_limit = compiled.action_rate_limits.get(action_id)
+            decision = action_limit and action_limit.hit(self._get_client_id(), time.time())
+            if decision and decision.exceeded:
+                return 429, {
+                    "error": f"Rate limit exceeded for action: {action_id}",
+                    "retry_after": math.ceil(decision.retry_after)
+                }
+
+        validator = compiled.input_validators[action_id]
+        errors = validator(params)
+        if errors:
+            return 400, {
+                "error": "Validation failed",
+                "details": errors
+            }
+        params = validator.apply_defaults(params)
+
+        if self.enable_logging:
+            self._log_action(action_id, params)
+        return self._call_handler(action_id, params)
 
-    def _generate_sitemap(self) -> List[Dict]:
-        """Generate AI sitemap from routes (override this method)"""
-        return []
+    def _serve_document(self, document: PreparedDocument) -> Response:
+        """Serve a prepared document, answering conditional requests with 304"""
+        status, headers, body = document.respond(request.headers)
+        return Response(body, status=status, headers=headers)
 
     def _is_ai_agent(self, req=None) -> bool:
         """Check if request is from an AI agent"""
@@ -111,46 +416,32 @@ class AWASMiddleware:
         client_id = self._get_client_id()
         current_time = time.time()
 
-        # Initialize client store
-        if client_id not in self.rate_limit_store:
-            self.rate_limit_store[client_id] = {
-                'requests': [],
-                'burst_count': 0
-            }
-
-        client_store = self.rate_limit_store[client_id]
-
-        # Remove old requests (older than 1 minute)
-        client_store['requests'] = [
-            t for t in client_store['requests'] 
-            if current_time - t < 60
-        ]
-
-        # Get rate limits from manifest
-        rate_limits = self.manifest.get('rate_limits', {})
-        requests_per_minute = rate_limits.get('requests_per_minute', 60)
-        burst_limit = rate_limits.get('burst_limit', 10)
+        # Check every rate limit tier in one pass (a batch is charged per item)
+        decision = self.rate_limit_backend.hit(client_id, current_time, self._request_cost())
+        g.awas_rate_limit = decision
 
-        # Check per-minute rate limit
-        if len(client_store['requests']) >= requests_per_minute:
+        if decision.exceeded:
             return jsonify({
-                "error": "Rate limit exceeded",
-                "retry_after": 60
+                "error": RATE_LIMIT_ERRORS[decision.exceeded],
+                "retry_after": math.ceil(decision.retry_after)
             }), 429
 
-        # Check burst limit
-        recent_requests = [
-            t for t in client_store['requests']
-            if current_time - t < 10
-        ]
-        if len(recent_requests) >= burst_limit:
-            return jsonify({
-                "error": "Burst limit exceeded",
-                "retry_after": 10
-            }), 429
+        # Remember the in-flight request so it is released on completion
+        if self.rate_limiter.concurrency is not None:
+            g.awas_rate_limit_client = client_id
+
+    def _add_rate_limit_headers(self, response):
+        """Attach X-RateLimit-* and Retry-After headers for AI agents"""
+        decision = g.get('awas_rate_limit')
+        if decision is not None:
+            response.headers.update(decision.headers())
+        return response
 
-        # Add current request
-        client_store['requests'].append(current_time)
+    def _release_rate_limit(self, exc=None):
+        """Release the concurrent request slot after the response completes"""
+        client_id = g.pop('awas_rate_limit_client', None)
+        if client_id is not None:
+            self.rate_limit_backend.release(client_id, time.time())
 
     def validate_action(self, action_id: str) -> Callable:
         """
@@ -164,15 +455,35 @@ class AWASMiddleware:
                 pass
         """
         def decorator(f):
+            # Resolve the action once; rebind only when the manifest is reloaded
+            bound = [self.compiled, self.compiled.registry.get(action_id)]
+
             @wraps(f)
             def decorated_function(*args, **kwargs):
+                # Use one manifest version for the whole request
+                compiled = self.compiled
+                g.awas_compiled = compiled
+
                 # Find action in manifest
-                action = self._get_action(action_id)
+                if bound[0] is not compiled:
+                    bound[:] = [compiled, compiled.registry.get(action_id)]
+                action = bound[1]
                 if not action:
                     return jsonify({
                         "error": f"Unknown action: {action_id}"
                     }), 400
 
+                # Check per-action rate limit hint
+                if self.enable_rate_limiting and self._is_ai_agent():
+                    action_limit = compiled.action_rate_limits.get(action_id)
+                    decision = action_limit and action_limit.hit(self._get_client_id(), time.time())
+                    if decision and decision.exceeded:
+                        g.awas_rate_limit = decision
+                        return jsonify({
+                            "error": f"Rate limit exceeded for action: {action_id}",
+                            "retry_after": math.ceil(decision.retry_after)
+                        }), 429
+
                 # Check authentication
                 if action.get('authentication_required', False):
                     if not self._check_authentication():
@@ -183,6 +494,11 @@ class AWASMiddleware:
                 # Validate inputs
                 if request.method in ['POST', 'PUT', 'PATCH']:
                     data = request.get_json() or {}
+                    if not isinstance(data, dict):
+                        return jsonify({
+                            "error": "Validation failed",
+                            "details": ["Request parameters must be of type object"]
+                        }), 400
                 else:
                     data = request.args.to_dict()
 
@@ -193,107 +509,325 @@ class AWASMiddleware:
                         "details": validation_result['errors']
                     }), 400
 
-                # Log action
-                if self.enable_logging:
-                    self._log_action(action_id, data)
+                # Validated parameters with declared defaults applied
+                g.awas_params = validation_result['params']
+
+                # Answer dry runs with a plan; reuse a previewed plan on commit
+                if action_id in self.planners and action.get('dryRunSupported'):
+                    g.awas_action_id = action_id
+                    preview_binding = (self._get_client_id(), self._caller_identity(), action_id,
+                                       fingerprint(g.awas_params))
+                    if self._is_dry_run(action):
+                        return self._preview(action_id, preview_binding)
+                    preview_token = request.headers.get(PREVIEW_TOKEN_HEADER)
+                    if preview_token:
+                        try:
+                            g.awas_plan = self.preview_cache.redeem(
+                                preview_token, preview_binding, time.time()
+                            )
+                        except InvalidPreviewToken as e:
+                            return jsonify({
+                                "error": str(e)
+                            }), 422
+                elif self._is_dry_run(action):
+                    # Never run the handler for a request that asked not to commit
+                    if action.get('dryRunSupported'):
+                        return jsonify({
+                            "error": f"No dry-run planner registered for action: {action_id}"
+                        }), 501
+                    return jsonify({
+                        "error": f"Dry run not supported for action: {action_id}"
+                    }), 400
 
-                # Execute original function
-                result = f(*args, **kwargs)
+                # Answer retries of an idempotency key from the stored response
+                idempotency_key = self._idempotency_key(action)
+                flight = stored = None
+                if idempotency_key is not None:
+                    if not idempotency_key or len(idempotency_key) > MAX_KEY_LENGTH:
+                        return jsonify({
+                            "error": "Invalid idempotency key"
+                        }), 400
+                    cache_key = (self._get_client_id(), self._caller_identity(), action_id,
+                                 idempotency_key)
+                    params_fingerprint = fingerprint(g.awas_params)
+                    try:
+                        stored, flight = self._join_idempotent(cache_key)
+                    except TimeoutError:
+                        response = jsonify({
+                            "error": "A request with this idempotency key is still in progress"
+                        })
+                        response.headers['Retry-After'] = '1'
+                        return response, 409
+                    if stored is not None:
+                        if stored.fingerprint != params_fingerprint:
+                            return jsonify({
+                                "error": "Idempotency key reused with different parameters"
+                            }), 422
+                        return Response(stored.body, status=stored.status, headers=[
+                            *stored.headers, ('Idempotent-Replayed', 'true')
+                        ])
+
+                try:
+                    # Log action
+                    if self.enable_logging:
+                        self._log_action(action_id, data)
+
+                    # Serve safe reads from the response cache, per caller when authenticated
+                    ttl = self._response_cache_ttl(compiled, action_id)
+                    identity = None
+                    if ttl and action.get('authentication_required'):
+                        identity = self._caller_identity()
+                        if identity is None:
+                            ttl = 0
+                    if ttl:
+                        read_key = (action_id, identity, fingerprint(g.awas_params))
+                        return self._serve_cached(
+                            read_key, ttl, lambda: self._run_action(f, action_id, args, kwargs)
+                        )
+
+                    # Execute original function
+                    result = self._run_action(f, action_id, args, kwargs)
+
+                    if idempotency_key is not None:
+                        response, stored = self._store_idempotent(cache_key, params_fingerprint, result)
+                        return response
+                    return result
+                finally:
+                    # Hand the outcome (None if the handler raised) to coalesced duplicates
+                    if flight is not None:
+                        self.idempotency_flights.finish(cache_key, flight, stored)
+
+            return decorated_function
+        return decorator
 
-                # Add AWAS headers to response
-                if isinstance(result, tuple):
-                    response, status_code = result
-                    if hasattr(response, 'headers'):
-                        response.headers['X-AI-Action-Success'] = 'true'
-                        response.headers['X-AI-Action-ID'] = action_id
-                    return response, status_code
+    def planner(self, action_id: str) -> Callable:
+        """
+        Register the function computing a dry-run plan for an action
 
-                return result
+        The planner receives the validated parameters and returns a
+        JSON-serializable plan. For actions declaring `dryRunSupported`,
+        a request with `X-AI-Dry-Run: true` (or to the action's
+        `previewUrl`) returns the plan and a preview token without
+        running the handler. The handler reads the plan with plan(),
+        which reuses the previewed plan when the commit carries the
+        token in `X-AI-Preview-Token`. A dry run of an action without a
+        planner is refused and never runs the handler.
 
-            return decorated_function
+        Usage:
+            @awas.planner('add_to_cart')
+            def plan_add_to_cart(params):
+                return {"unit_price": 29.99, "in_stock": True}
+        """
+        def decorator(f):
+            self.planners[action_id] = f
+
+            action = self.compiled.registry.get(action_id) or {}
+            preview_url = action.get('previewUrl')
+            if preview_url and preview_url.startswith('/'):
+                self.app.add_url_rule(
+                    preview_url, f'awas_preview_{action_id}',
+                    self.validate_action(action_id)(lambda: None),
+                    methods=[(action.get('method') or 'GET').upper()]
+                )
+            return f
         return decorator
 
+    def plan(self) -> Optional[Dict]:
+        """The current action's plan: reused from its preview, otherwise computed now"""
+        if g.get('awas_plan') is None:
+            planner = self.planners.get(g.get('awas_action_id'))
+            if planner is None:
+                return None
+            g.awas_plan = planner(g.awas_params)
+        return g.awas_plan
+
+    def _is_dry_run(self, action: Dict) -> bool:
+        """Check if the request asks for a preview instead of the action"""
+        return request.headers.get(DRY_RUN_HEADER) == 'true' or request.path == action.get('previewUrl')
+
+    def _preview(self, action_id: str, binding) -> Response:
+        """Compute an action's plan and return it with a token for the commit"""
+        plan = self.planners[action_id](g.awas_params)
+        token = self.preview_cache.issue(binding, plan, time.time())
+        response = jsonify({
+            "action_id": action_id,
+            "preview": plan,
+            "preview_token": token,
+            "expires_in": self.preview_cache.ttl
+        })
+        if token:
+            response.headers[PREVIEW_TOKEN_HEADER] = token
+        return response
+
+    def _run_action(self, f: Callable, action_id: str, args, kwargs):
+        """Call the view function and add AWAS headers to its response"""
+        result = f(*args, **kwargs)
+
+        if isinstance(result, tuple):
+            response, status_code = result
+            if hasattr(response, 'headers'):
+                response.headers['X-AI-Action-Success'] = 'true'
+                response.headers['X-AI-Action-ID'] = action_id
+            return response, status_code
+
+        return result
+
+    def _response_cache_ttl(self, compiled: CompiledManifest, action_id: str) -> float:
+        """Seconds a response to this action may be cached (0 if it may not)"""
+        if self.response_cache is None or action_id not in compiled.cache_ttls:
+            return 0
+        ttl = compiled.cache_ttls[action_id]
+        return self.response_cache.default_ttl if ttl is None else ttl
+
+    def _serve_cached(self, key, ttl: float, run: Callable) -> Response:
+        """Answer a safe read from the cache, letting one request refill a missing entry"""
+        cache = self.response_cache
+        flight, leader = cache.flights.begin(key)
+        if not leader:
+            try:
+                entry = cache.flights.wait(flight, cache.wait_timeout)
+            except TimeoutError:
+                entry = None
+            if entry is None:
+                # Reads are safe, so run the handler rather than fail
+                return run()
+            return self._cached_response(entry)
+
+        entry = None
+        try:
+            entry = cache.get(key, time.time())
+            if entry is not None:
+                return self._cached_response(entry)
+
+            response = make_response(run())
+            ttl = cache_control_ttl(response.headers.get('Cache-Control'), ttl)
+            if response.status_code == 200 and ttl > 0 and not response.is_streamed:
+                now = time.time()
+                entry = CachedResponse(
+                    response.status_code,
+                    [(name, value) for name, value in response.headers.items()
+                     if name != 'Content-Length'],
+                    response.get_data(),
+                    now,
+                    now + ttl
+                )
+                cache.put(key, entry)
+            response.headers['X-AI-Cache'] = 'MISS'
+            return response
+        finally:
+            cache.flights.finish(key, flight, entry)
+
+    def _cached_response(self, entry: CachedResponse) -> Response:
+        """Rebuild a response from a cache entry"""
+        return Response(entry.body, status=entry.status, headers=[
+            *entry.headers,
+            ('Age', str(int(time.time() - entry.stored))),
+            ('X-AI-Cache', 'HIT')
+        ])
+
+    def _idempotency_key(self, action: Dict) -> Optional[str]:
+        """Idempotency key sent for an action that supports one"""
+        if not action.get('idempotencyKeySupported'):
+            return None
+        key = request.headers.get(action.get('idempotencyKeyHeader') or 'Idempotency-Key')
+        return key.strip() if key is not None else None
+
+    def _join_idempotent(self, cache_key):
+        """
+        Find the outcome of an earlier call with the same idempotency key
+
+        Returns (stored response, None) when one exists, waiting for a
+        concurrent duplicate still in flight, or (None, flight) when this
+        request is the one to execute and must finish the flight.
+        """
+        flight, leader = self.idempotency_flights.begin(cache_key)
+        if not leader:
+            stored = self.idempotency_flights.wait(flight, self.idempotency_wait_timeout)
+            if stored is None:
+                # The original failed without a response; treat it as still pending
+                raise TimeoutError("In-flight execution failed")
+            return stored, None
+
+        # Earlier leaders store their response before finishing their flight
+        stored = self.idempotency_cache.get(cache_key, time.time())
+        if stored is not None:
+            self.idempotency_flights.finish(cache_key, flight, stored)
+            return stored, None
+        return None, flight
+
+    def _store_idempotent(self, cache_key, params_fingerprint: str, result):
+        """Remember a completed response so retries replay it"""
+        response = make_response(result)
+        if response.is_streamed:
+            return response, None
+
+        entry = self.idempotency_cache.entry(
+            response.status_code,
+            [(name, value) for name, value in response.headers.items()
+             if name != 'Content-Length'],
+            response.get_data(),
+            params_fingerprint,
+            time.time()
+        )
+        # Server errors are only shared with coalesced duplicates, so a later retry can succeed
+        if response.status_code < 500:
+            self.idempotency_cache.put(cache_key, entry)
+        return response, entry
+
     def _get_action(self, action_id: str) -> Optional[Dict]:
         """Get action from manifest by ID"""
-        for action in self.manifest.get('actions', []):
-            if action.get('id') == action_id:
-                return action
-        return None
+        return self.registry.get(action_id)
 
     def _check_authentication(self) -> bool:
         """Check if request is authenticated (override this method)"""
         # Implement your authentication logic
         return 'Authorization' in request.headers or 'user_id' in g
 
+    def _caller_identity(self) -> Optional[str]:
+        """
+        Authenticated identity that stored responses are scoped to (override
+        along with _check_authentication)
+
+        Uses g.user_id when the application sets it, otherwise a hash of the
+        Authorization header; None for anonymous requests. X-AI-Agent-Name is
+        chosen by the client, so it never identifies a caller on its own.
+        """
+        user_id = g.get('user_id')
+        if user_id is not None:
+            return f'user:{user_id}'
+        credential = request.headers.get('Authorization')
+        if credential:
+            return 'credential:' + hashlib.sha256(credential.encode('utf-8')).hexdigest()
+        return None
+
     def _validate_inputs(self, action: Dict, data: Dict) -> Dict:
         """Validate input parameters"""
-        errors = []
-        inputs = action.get('inputs', [])
-
-        for input_def in inputs:
-            name = input_def.get('name')
-            required = input_def.get('required', False)
-            param_type = input_def.get('type', 'string')
-            validation = input_def.get('validation', {})
-
-            value = data.get(name)
-
-            # Check required
-            if required and value is None:
-                errors.append(f"Parameter '{name}' is required")
-                continue
-
-            if value is None:
-                continue
-
-            # Type validation
-            type_validators = {
-                'string': str,
-                'integer': int,
-                'number': (int, float),
-                'boolean': bool,
-                'array': list,
-                'object': dict
-            }
-
-            expected_type = type_validators.get(param_type)
-            if expected_type and not isinstance(value, expected_type):
-                errors.append(f"Parameter '{name}' should be {param_type}")
-                continue
-
-            # Validation rules
-            if validation:
-                # Pattern validation
-                if 'pattern' in validation and isinstance(value, str):
-                    import re
-                    if not re.match(validation['pattern'], value):
-                        errors.append(f"Parameter '{name}' does not match required pattern")
-
-                # Range validation
-                if isinstance(value, (int, float)):
-                    if 'min' in validation and value < validation['min']:
-                        errors.append(f"Parameter '{name}' must be >= {validation['min']}")
-                    if 'max' in validation and value > validation['max']:
-                        errors.append(f"Parameter '{name}' must be <= {validation['max']}")
-
-                # Length validation
-                if isinstance(value, (str, list)):
-                    if 'minLength' in validation and len(value) < validation['minLength']:
-                        errors.append(f"Parameter '{name}' must have length >= {validation['minLength']}")
-                    if 'maxLength' in validation and len(value) > validation['maxLength']:
-                        errors.append(f"Parameter '{name}' must have length <= {validation['maxLength']}")
-
-                # Enum validation
-                if 'enum' in validation and value not in validation['enum']:
-                    errors.append(f"Parameter '{name}' must be one of: {', '.join(map(str, validation['enum']))}")
+        compiled = g.get('awas_compiled') or self.compiled
+        validator = compiled.input_validators.get(action.get('id'))
+        if validator is None:
+            validator = ActionValidator(action)
 
+        errors = validator(data)
         return {
             'valid': len(errors) == 0,
-            'errors': errors
+            'errors': errors,
+            'params': validator.apply_defaults(data) if not errors else data
         }
 
     def _log_action(self, action_id: str, params: Dict):
         """Log AI action for audit trail"""
+        if self.audit_sink is not None:
+            # Serialization happens on the sink's writer thread
+            self.audit_sink.submit((
+                time.time(),
+                action_id,
+                request.headers.get('X-AI-Agent-Name', 'Unknown'),
+                request.remote_addr,
+                g.get('user_id', 'anonymous'),
+                snapshot(params)
+            ))
+            return
+
         log_entry = {
             'timestamp': datetime.utcnow().isoformat(),
             'action_id': action_id,
@@ -323,6 +857,7 @@ if __name__ == '__main__':
     @awas.validate_action('add_to_cart')
     def add_to_cart():
         data = request.get_json()
+        plan = awas.plan()
 
         # Your cart logic here
         result = {
@@ -330,12 +865,19 @@ if __name__ == '__main__':
             "cart_id": "cart_123456",
             "product_id": data.get('product_id'),
             "quantity": data.get('quantity', 1),
+            "unit_price": plan['unit_price'],
             "total_items": 3,
             "cart_total": 899.97
         }
 
         return jsonify(result), 200
 
+    # Pricing and stock checks computed once for the preview (POST /api/cart/preview)
+    # and reused by a commit sending the returned X-AI-Preview-Token
+    @awas.planner('add_to_cart')
+    def plan_add_to_cart(params):
+        return {"unit_price": 299.99, "quantity": params['quantity'], "in_stock": True}
+
     @app.route('/api/search', methods=['GET'])
     @awas.validate_action('search_products')
     def search_products():
@@ -359,4 +901,16 @@ if __name__ == '__main__':
 
         return jsonify(results), 200
 
+    # The same action through the generic dispatch route
+    # (GET /api/ai-actions/search_products, the method the manifest declares)
+    @awas.handler('search_products')
+    def dispatch_search_products(params):
+        return jsonify({"success": True, "query": params['q'], "results": []}), 200
+
+    # Handlers called by the find_and_add workflow
+    # (POST /api/ai-actions/workflows/find_and_add)
+    @awas.handler('add_to_cart')
+    def dispatch_add_to_cart(params):
+        return jsonify({"cart_id": "cart_123456", "total_items": params['quantity']}), 200
+
     app.run(debug=True, port=5000)
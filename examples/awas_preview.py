@@ -0,0 +1,170 @@
+"""
+AWAS Preview Tokens
+Version 1.0.0
+
+Keeps the plan computed for a dry run (pricing, stock checks, ...) so the
+commit that follows can reuse it instead of computing it again. The plan
+is stored under a short-lived token signed with HMAC-SHA256 over the
+token id, its expiry and the request it was issued for (client, user,
+action and parameters). A token for a stored plan presented with
+different parameters, or a forged signature, is rejected. Plans are
+redeemed once, expire after a TTL and the store evicts least recently
+issued plans to stay within a byte budget.
+
+Plans live in the process that issued them. A commit that reaches
+another worker finds no plan for its token and the plan is recomputed,
+exactly as for an expired token, so no shared secret is needed.
+"""
+
+import base64
+import hashlib
+import hmac
+import json
+import math
+import secrets
+import threading
+from collections import OrderedDict
+from typing import Dict, Hashable, Optional
+
+from awas_idempotency import ENTRY_OVERHEAD, fingerprint
+
+# Request header carrying a preview token on the commit request
+PREVIEW_TOKEN_HEADER = 'X-AI-Preview-Token'
+
+# Request header asking for a dry run instead of the action
+DRY_RUN_HEADER = 'X-AI-Dry-Run'
+
+
+class InvalidPreviewToken(ValueError):
+    """A preview token that is malformed or was not issued for this request"""
+
+
+class PreviewPlan:
+    """A plan waiting for its commit"""
+
+    __slots__ = ('plan', 'expires', 'size')
+
+    def __init__(self, plan: Dict, expires: float):
+        self.plan = plan
+        self.expires = expires
+        self.size = ENTRY_OVERHEAD + len(json.dumps(plan, default=str))
+
+
+class PreviewCache:
+    """
+    TTL and memory-bounded store of dry-run plans keyed by signed token
+
+    Usage:
+        previews = PreviewCache(ttl=300)
+        awas = AWASMiddleware(app, preview_cache=previews)
+    """
+
+    def __init__(self, ttl: float = 300, max_bytes: int = 8 * 1024 * 1024,
+                 secret: Optional[bytes] = None):
+        """
+        Initialize preview cache
+
+        Args:
+            ttl: Seconds a preview token can be committed
+            max_bytes: Approximate memory budget for stored plans
+            secret: HMAC key for signing tokens (default: random per process,
+                which is enough since each process only redeems its own tokens)
+        """
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.issued = 0
+        self.redeemed = 0
+        self.missed = 0
+        self.expired = 0
+        self.evicted = 0
+        self.rejected = 0
+        self._secret = secret or secrets.token_bytes(32)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _sign(self, token_id: str, expires: int, binding: Hashable) -> str:
+        message = f'{token_id}.{expires}.{fingerprint(list(binding))}'.encode('utf-8')
+        digest = hmac.new(self._secret, message, hashlib.sha256).digest()
+        return base64.urlsafe_b64encode(digest).rstrip(b'=').decode('ascii')
+
+    def issue(self, binding: Hashable, plan: Dict, now: float) -> Optional[str]:
+        """Store a plan and return its token (None if the plan is too large for the budget)"""
+        expires = math.ceil(now + self.ttl)
+        entry = PreviewPlan(plan, expires)
+        if entry.size > self.max_bytes:
+            return None
+
+        token_id = secrets.token_urlsafe(16)
+        with self._lock:
+            self._expire(now)
+            self._entries[token_id] = entry
+            self.bytes += entry.size
+            self.issued += 1
+            while self.bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.bytes -= evicted.size
+                self.evicted += 1
+        return f'{token_id}.{expires}.{self._sign(token_id, expires, binding)}'
+
+    def redeem(self, token: str, binding: Hashable, now: float) -> Optional[Dict]:
+        """
+        Remove and return the plan for a token, or None if this process holds
+        no plan for it (issued by another worker, expired or evicted); raises
+        InvalidPreviewToken for a stored plan's token not issued for this binding
+        """
+        parts = token.split('.')
+        if len(parts) != 3 or not parts[1].isdigit():
+            self._reject()
+            raise InvalidPreviewToken("Malformed preview token")
+        token_id, expires, signature = parts[0], int(parts[1]), parts[2]
+        if token_id not in self._entries:
+            with self._lock:
+                self.missed += 1
+            return None
+        if not hmac.compare_digest(signature, self._sign(token_id, expires, binding)):
+            self._reject()
+            raise InvalidPreviewToken("Preview token was not issued for this request")
+        if expires <= now:
+            return None
+
+        with self._lock:
+            entry = self._entries.pop(token_id, None)
+            if entry is None:
+                self.missed += 1
+                return None
+            self.bytes -= entry.size
+            if entry.expires <= now:
+                self.expired += 1
+                return None
+            self.redeemed += 1
+            return entry.plan
+
+    def _reject(self):
+        with self._lock:
+            self.rejected += 1
+
+    def _expire(self, now: float):
+        """Drop expired plans from the oldest end"""
+        entries = self._entries
+        while entries:
+            token_id, entry = next(iter(entries.items()))
+            if entry.expires > now:
+                break
+            del entries[token_id]
+            self.bytes -= entry.size
+            self.expired += 1
+
+    def stats(self) -> Dict:
+        """Report store size and counters"""
+        return {
+            'entries': len(self._entries),
+            'bytes': self.bytes,
+            'max_bytes': self.max_bytes,
+            'issued': self.issued,
+            'redeemed': self.redeemed,
+            'missed': self.missed,
+            'expired': self.expired,
+            'evicted': self.evicted,
+            'rejected': self.rejected
+        }
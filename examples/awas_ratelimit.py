@@ -0,0 +1,701 @@
+"""
+AWAS Rate Limiting Engines
+Version 1.0.0
+
+Constant-time, constant-memory rate limiting algorithms used by the
+AWAS middleware. Each client is represented by a flat list of floats so
+that several limits (e.g. per-minute and burst) share one state object.
+
+State lives in a RateLimitBackend: in-process for a single worker, or a
+shared memory table so that all workers on a host enforce one limit.
+"""
+
+import asyncio
+import hashlib
+import math
+import mmap
+import os
+import re
+import struct
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+
+
+WINDOW_UNITS = {
+    's': 1, 'sec': 1, 'second': 1, 'seconds': 1,
+    'm': 60, 'min': 60, 'minute': 60, 'minutes': 60,
+    'h': 3600, 'hour': 3600, 'hours': 3600,
+    'd': 86400, 'day': 86400, 'days': 86400,
+}
+
+WINDOW_PATTERN = re.compile(r'^\s*(\d+(?:\.\d+)?)?\s*([a-z]+)\s*$')
+
+
+# Error message for each rate limit tier
+RATE_LIMIT_ERRORS = {
+    'minute': "Rate limit exceeded",
+    'burst': "Burst limit exceeded",
+    'hour': "Hourly rate limit exceeded",
+    'concurrent': "Too many concurrent requests",
+}
+
+def parse_window(window: str) -> float:
+    """Convert a window string such as '1m', '30s' or 'hour' to seconds"""
+    match = WINDOW_PATTERN.match(str(window).lower())
+    if not match or match.group(2) not in WINDOW_UNITS:
+        raise ValueError(f"Invalid rate limit window: {window!r}")
+    amount = float(match.group(1) or 1)
+    return amount * WINDOW_UNITS[match.group(2)]
+
+
+def parse_rate_limit_hint(hint) -> Tuple[int, float]:
+    """
+    Parse an action's rateLimitHint
+
+    Accepts the manifest object form {"requests": 50, "window": "1m"}
+    as well as the string form "50/1m".
+
+    Returns:
+        (max_requests, window_seconds)
+    """
+    if isinstance(hint, dict):
+        requests, window = hint.get('requests'), hint.get('window', '1m')
+    else:
+        requests, _, window = str(hint).partition('/')
+    try:
+        requests = int(requests)
+    except (TypeError, ValueError):
+        raise ValueError(f"Invalid rate limit hint: {hint!r}")
+    return requests, parse_window(window)
+
+
+class SlidingWindowCounter:
+    """Sliding window approximated from the current and previous fixed windows"""
+
+    # Floats used per client: [window_start, previous_count, current_count]
+    width = 3
+
+    def __init__(self, limit: int, window: float):
+        self.limit = limit
+        self.window = float(window)
+
+    def init(self, state: List[float], offset: int, now: float):
+        """Initialize this limit's slots in a client state"""
+        state[offset] = math.floor(now / self.window) * self.window
+        state[offset + 1] = 0.0
+        state[offset + 2] = 0.0
+
+    def _roll(self, state: List[float], offset: int, now: float):
+        """Advance the fixed windows so that `now` falls in the current one"""
+        start = state[offset]
+        if now < start + self.window:
+            return
+        if now < start + 2 * self.window:
+            state[offset + 1] = state[offset + 2]
+        else:
+            state[offset + 1] = 0.0
+        state[offset + 2] = 0.0
+        state[offset] = math.floor(now / self.window) * self.window
+
+    def count(self, state: List[float], offset: int, now: float) -> float:
+        """Estimated number of requests in the trailing window"""
+        self._roll(state, offset, now)
+        elapsed = (now - state[offset]) / self.window
+        return state[offset + 1] * (1.0 - elapsed) + state[offset + 2]
+
+    def allows(self, state: List[float], offset: int, now: float, cost: int = 1) -> bool:
+        """Check whether `cost` more requests fit in the limit"""
+        return self.count(state, offset, now) + cost <= self.limit
+
+    def consume(self, state: List[float], offset: int, now: float, cost: int = 1):
+        """Record `cost` requests"""
+        state[offset + 2] += cost
+
+    def retry_after(self, state: List[float], offset: int, now: float) -> float:
+        """Seconds until one more request fits in the limit"""
+        self._roll(state, offset, now)
+        start, previous, current = state[offset:offset + 3]
+        elapsed = now - start
+        spare = self.limit - 1 - current
+
+        if spare >= 0:
+            # Wait for the previous window's weight to decay enough
+            if previous <= spare:
+                return 0.0
+            return max(0.0, self.window * (1.0 - spare / previous) - elapsed)
+
+        # Current window is full: it becomes the previous one and decays
+        decay = self.window * (1.0 - (self.limit - 1) / current)
+        return self.window - elapsed + max(0.0, decay)
+
+    def reset_at(self, state: List[float], offset: int, now: float) -> float:
+        """Time at which the full limit is available again"""
+        self._roll(state, offset, now)
+        if state[offset + 2]:
+            return state[offset] + 2 * self.window
+        if state[offset + 1]:
+            return state[offset] + self.window
+        return now
+
+
+class TokenBucket:
+    """Token bucket refilled continuously at limit/window tokens per second"""
+
+    # Floats used per client: [tokens, last_refill]
+    width = 2
+
+    def __init__(self, limit: int, window: float):
+        self.limit = limit
+        self.window = float(window)
+        self.rate = limit / self.window
+
+    def init(self, state: List[float], offset: int, now: float):
+        """Initialize this limit's slots in a client state"""
+        state[offset] = float(self.limit)
+        state[offset + 1] = now
+
+    def count(self, state: List[float], offset: int, now: float) -> float:
+        """Number of tokens already spent from the bucket"""
+        elapsed = max(0.0, now - state[offset + 1])
+        state[offset] = min(float(self.limit), state[offset] + elapsed * self.rate)
+        state[offset + 1] = now
+        return self.limit - state[offset]
+
+    def allows(self, state: List[float], offset: int, now: float, cost: int = 1) -> bool:
+        """Check whether `cost` more requests fit in the limit"""
+        return self.count(state, offset, now) + cost <= self.limit
+
+    def consume(self, state: List[float], offset: int, now: float, cost: int = 1):
+        """Record `cost` requests"""
+        state[offset] -= cost
+
+    def retry_after(self, state: List[float], offset: int, now: float) -> float:
+        """Seconds until one more request fits in the limit"""
+        self.count(state, offset, now)
+        return max(0.0, (1.0 - state[offset]) / self.rate)
+
+    def reset_at(self, state: List[float], offset: int, now: float) -> float:
+        """Time at which the bucket is full again"""
+        self.count(state, offset, now)
+        return now + (self.limit - state[offset]) / self.rate
+
+
+class ConcurrencyCounter:
+    """Number of requests currently in flight"""
+
+    # Floats used per client: [in_flight]
+    width = 1
+    window = 0.0
+
+    def __init__(self, limit: int):
+        self.limit = limit
+
+    def init(self, state: List[float], offset: int, now: float):
+        """Initialize this limit's slots in a client state"""
+        state[offset] = 0.0
+
+    def count(self, state: List[float], offset: int, now: float) -> float:
+        """Number of requests in flight"""
+        return state[offset]
+
+    def allows(self, state: List[float], offset: int, now: float, cost: int = 1) -> bool:
+        """Check whether one more request may start (a batch is one request in flight)"""
+        return state[offset] + 1 <= self.limit
+
+    def consume(self, state: List[float], offset: int, now: float, cost: int = 1):
+        """Record a request starting"""
+        state[offset] += 1
+
+    def release(self, state: List[float], offset: int):
+        """Record a request finishing"""
+        state[offset] = max(0.0, state[offset] - 1)
+
+    def retry_after(self, state: List[float], offset: int, now: float) -> float:
+        """In-flight requests have no known end, so suggest a short pause"""
+        return 1.0
+
+
+ALGORITHMS = {
+    'sliding_window': SlidingWindowCounter,
+    'token_bucket': TokenBucket,
+}
+
+
+class RateLimitDecision:
+    """Outcome of a rate limit check, with the most restrictive limit's quota"""
+
+    __slots__ = ('exceeded', 'limit', 'remaining', 'reset', 'retry_after')
+
+    def __init__(self, exceeded: Optional[str], limit: int, remaining: int,
+                 reset: float, retry_after: float):
+        self.exceeded = exceeded
+        self.limit = limit
+        self.remaining = remaining
+        self.reset = reset
+        self.retry_after = retry_after
+
+    def headers(self) -> Dict[str, str]:
+        """X-RateLimit-* response headers, plus Retry-After when rejected"""
+        headers = {
+            'X-RateLimit-Limit': str(self.limit),
+            'X-RateLimit-Remaining': str(self.remaining),
+            'X-RateLimit-Reset': str(math.ceil(self.reset)),
+        }
+        if self.exceeded:
+            headers['Retry-After'] = str(math.ceil(self.retry_after))
+        return headers
+
+
+class RateLimitEngine:
+    """
+    Evaluate several named limits against a single per-client state
+
+    Usage:
+        engine = RateLimitEngine([('minute', 100, 60), ('burst', 20, 10)])
+        state = engine.new_state(time.time())
+        decision = engine.hit(state, time.time())
+        if decision.exceeded: ...
+    """
+
+    def __init__(self, limits: List[Tuple[str, int, float]],
+                 algorithm: str = 'sliding_window',
+                 concurrent_requests: Optional[int] = None):
+        """
+        Initialize rate limit engine
+
+        Args:
+            limits: (name, max_requests, window_seconds) for each limit
+            algorithm: 'sliding_window' or 'token_bucket'
+            concurrent_requests: Maximum requests in flight per client
+        """
+        if algorithm not in ALGORITHMS:
+            raise ValueError(f"Unknown rate limit algorithm: {algorithm}")
+
+        self.algorithm = algorithm
+        self.limits = []
+        offset = 0
+        for name, limit, window in limits:
+            limiter = ALGORITHMS[algorithm](limit, window)
+            self.limits.append((name, limiter, offset))
+            offset += limiter.width
+
+        self.concurrency = None
+        if concurrent_requests:
+            self.concurrency = ConcurrencyCounter(concurrent_requests)
+            self.limits.append(('concurrent', self.concurrency, offset))
+            self.concurrency_offset = offset
+            offset += ConcurrencyCounter.width
+
+        self.width = offset
+        self.max_window = max((w for _, _, w in limits), default=0.0)
+
+    @classmethod
+    def from_manifest(cls, rate_limits: Dict,
+                      algorithm: str = 'sliding_window') -> 'RateLimitEngine':
+        """Build an engine from a manifest `rate_limits` object"""
+        limits = [
+            ('minute', rate_limits.get('requests_per_minute', 60), 60),
+            ('burst', rate_limits.get('burst_limit', 10), 10),
+        ]
+        if rate_limits.get('requests_per_hour'):
+            limits.append(('hour', rate_limits['requests_per_hour'], 3600))
+
+        return cls(limits, algorithm=algorithm,
+                   concurrent_requests=rate_limits.get('concurrent_requests'))
+
+    def new_state(self, now: float) -> List[float]:
+        """Create the state for a new client"""
+        state = [0.0] * self.width
+        for _, limiter, offset in self.limits:
+            limiter.init(state, offset, now)
+        return state
+
+    def hit(self, state: List[float], now: float, cost: int = 1) -> RateLimitDecision:
+        """
+        Record `cost` requests (e.g. the items of a batch) if every limit allows them
+
+        Returns:
+            Decision naming the first exceeded limit (None if the requests were counted)
+        """
+        for name, limiter, offset in self.limits:
+            if not limiter.allows(state, offset, now, cost):
+                return self.decide(state, now, name)
+
+        for _, limiter, offset in self.limits:
+            limiter.consume(state, offset, now, cost)
+        return self.decide(state, now)
+
+    def decide(self, state: List[float], now: float,
+               exceeded: Optional[str] = None) -> RateLimitDecision:
+        """Report the quota of the most restrictive windowed limit"""
+        tightest = None
+        retry_after = 0.0
+        for name, limiter, offset in self.limits:
+            if name == exceeded:
+                retry_after = limiter.retry_after(state, offset, now)
+            if not limiter.window:
+                continue
+            remaining = max(0, int(limiter.limit - limiter.count(state, offset, now)))
+            if tightest is None or remaining < tightest[0]:
+                tightest = (remaining, limiter, offset)
+
+        if tightest is None:
+            return RateLimitDecision(exceeded, 0, 0, now, retry_after)
+
+        remaining, limiter, offset = tightest
+        return RateLimitDecision(exceeded, limiter.limit, remaining,
+                                 limiter.reset_at(state, offset, now), retry_after)
+
+    def release(self, state: List[float]):
+        """Record the end of a request counted by hit()"""
+        if self.concurrency is not None:
+            self.concurrency.release(state, self.concurrency_offset)
+
+
+class ClientStore:
+    """
+    Bounded per-client state store with LRU and idle-TTL eviction
+
+    Entries are kept in last-access order, so both idle clients and the
+    least recently used ones are always found at the front.
+    """
+
+    def __init__(self, ttl: float, max_entries: int = 10000):
+        """
+        Initialize client store
+
+        Args:
+            ttl: Seconds of inactivity after which a client is dropped
+            max_entries: Maximum number of clients kept in memory
+        """
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.expired = 0
+        self.evicted = 0
+        self._entries = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, client_id: str) -> bool:
+        return client_id in self._entries
+
+    def get(self, client_id: str, now: float,
+            factory: Callable[[float], List[float]]) -> List[float]:
+        """Return the state for a client, creating it with `factory` if needed"""
+        self._expire(now)
+
+        entry = self._entries.get(client_id)
+        if entry is not None:
+            entry[0] = now
+            self._entries.move_to_end(client_id)
+            return entry[1]
+
+        if len(self._entries) >= self.max_entries:
+            self._entries.popitem(last=False)
+            self.evicted += 1
+
+        state = factory(now)
+        self._entries[client_id] = [now, state]
+        return state
+
+    def _expire(self, now: float):
+        """Drop clients idle for longer than the TTL"""
+        entries = self._entries
+        while entries:
+            client_id, entry = next(iter(entries.items()))
+            if now - entry[0] < self.ttl:
+                break
+            del entries[client_id]
+            self.expired += 1
+
+    def stats(self) -> Dict:
+        """Report store size and eviction counters"""
+        return {
+            'clients': len(self._entries),
+            'max_entries': self.max_entries,
+            'expired': self.expired,
+            'evicted': self.evicted
+        }
+
+
+class RateLimitBackend:
+    """Interface for rate limit state storage"""
+
+    # Whether hit() and release() may wait on I/O or cross-process locks
+    blocking = False
+
+    def bind(self, engine: RateLimitEngine):
+        """Attach the engine whose limits this backend enforces"""
+        self.engine = engine
+
+    def hit(self, client_id: str, now: float, cost: int = 1) -> RateLimitDecision:
+        """
+        Record `cost` requests for a client in one state update
+
+        Returns:
+            Decision naming the first exceeded limit (None if the requests were counted)
+        """
+        raise NotImplementedError
+
+    def release(self, client_id: str, now: float):
+        """Record the end of a request that hit() allowed"""
+
+    def for_action(self, action_id: str, max_clients: int) -> 'RateLimitBackend':
+        """
+        Unbound backend for one action's rateLimitHint, kept in the same
+        storage as this one (this default keeps it in-process)
+        """
+        return InProcessBackend(max_entries=max_clients)
+
+    async def ahit(self, client_id: str, now: float, cost: int = 1) -> RateLimitDecision:
+        """hit() for asyncio servers; blocking backends run in a worker thread"""
+        if self.blocking:
+            return await asyncio.to_thread(self.hit, client_id, now, cost)
+        return self.hit(client_id, now, cost)
+
+    async def arelease(self, client_id: str, now: float):
+        """release() for asyncio servers"""
+        if self.blocking:
+            await asyncio.to_thread(self.release, client_id, now)
+        else:
+            self.release(client_id, now)
+
+    def stats(self) -> Dict:
+        """Report backend statistics"""
+        return {}
+
+
+class InProcessBackend(RateLimitBackend):
+    """
+    Rate limit state kept in this process's memory
+
+    Clients are spread over `stripes` independent stores, each guarded by
+    its own lock, so threads serving different agents rarely contend.
+    """
+
+    def __init__(self, max_entries: int = 10000, stripes: int = 16):
+        """
+        Initialize in-process backend
+
+        Args:
+            max_entries: Maximum number of clients kept in memory
+            stripes: Number of independently locked client stores
+        """
+        self.max_entries = max_entries
+        self.stripes = stripes
+        self.engine = None
+        self._bound = (None, [])
+
+    def bind(self, engine: RateLimitEngine):
+        """Attach the engine and reset client state"""
+        per_stripe = max(1, self.max_entries // self.stripes)
+        stripes = [
+            (threading.Lock(), ClientStore(ttl=engine.max_window, max_entries=per_stripe))
+            for _ in range(self.stripes)
+        ]
+        # One assignment, so a concurrent hit never pairs an engine with another's state
+        self._bound = (engine, stripes)
+        self.engine = engine
+
+    def hit(self, client_id: str, now: float, cost: int = 1) -> RateLimitDecision:
+        engine, stripes = self._bound
+        lock, store = stripes[hash(client_id) % self.stripes]
+        with lock:
+            state = store.get(client_id, now, engine.new_state)
+            return engine.hit(state, now, cost)
+
+    def release(self, client_id: str, now: float):
+        engine, stripes = self._bound
+        lock, store = stripes[hash(client_id) % self.stripes]
+        with lock:
+            state = store.get(client_id, now, engine.new_state)
+            engine.release(state)
+
+    def stats(self) -> Dict:
+        totals = {'clients': 0, 'max_entries': 0, 'expired': 0, 'evicted': 0}
+        for lock, store in self._bound[1]:
+            with lock:
+                for name, value in store.stats().items():
+                    totals[name] += value
+        return totals
+
+
+class SharedMemoryBackend(RateLimitBackend):
+    """
+    Rate limit state shared by all processes on a host
+
+    State is kept in a memory-mapped file laid out as a fixed-size,
+    set-associative table: a client hashes to one bucket of `ways` slots.
+    Each bucket is updated under an exclusive byte-range lock on the file,
+    so gunicorn workers mapping the same path see one consistent count.
+    Threads within a worker are serialized per bucket stripe, since
+    fcntl locks only exclude other processes.
+    When a bucket is full, the least recently seen client is replaced.
+
+    Usage:
+        backend = SharedMemoryBackend('/dev/shm/awas-ratelimit')
+        awas = AWASMiddleware(app, rate_limit_backend=backend)
+    """
+
+    # Waiting for another process's bucket lock must not stall an event loop
+    blocking = True
+
+    MAGIC = b'AWASRL01'
+    # magic, bucket count, ways, floats per client state
+    HEADER = struct.Struct('<8sIII')
+    # client key hash, last seen
+    SLOT_HEADER = struct.Struct('<Qd')
+
+    def __init__(self, path: str, buckets: int = 4096, ways: int = 4,
+                 stripes: int = 16):
+        """
+        Initialize shared memory backend
+
+        Args:
+            path: File to map, preferably on tmpfs (e.g. /dev/shm)
+            buckets: Number of hash buckets in the table
+            ways: Client slots per bucket
+            stripes: Number of thread locks the buckets are spread over
+        """
+        try:
+            import fcntl
+        except ImportError:
+            raise RuntimeError("SharedMemoryBackend requires a POSIX platform (fcntl)")
+
+        self._fcntl = fcntl
+        self.path = path
+        self.buckets = buckets
+        self.ways = ways
+        self.engine = None
+        self.evicted = 0
+        self._locks = [threading.Lock() for _ in range(stripes)]
+        self._fd = None
+        self._map = None
+
+    def bind(self, engine: RateLimitEngine):
+        """Attach the engine and map the shared table"""
+        if self._map is not None:
+            # Rebinding (e.g. on manifest reload) keeps the mapped table
+            if engine.width != self.engine.width:
+                raise ValueError(
+                    f"Shared rate limit table {self.path} cannot change layout while mapped"
+                )
+            self.engine = engine
+            return
+
+        self.engine = engine
+        self._state = struct.Struct(f'<{engine.width}d')
+        self._slot_size = self.SLOT_HEADER.size + self._state.size
+        self._bucket_size = self._slot_size * self.ways
+        size = self.HEADER.size + self._bucket_size * self.buckets
+        self._open(size)
+
+    def _open(self, size: int):
+        """Create or attach to the shared table file"""
+        self.close()
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        fcntl = self._fcntl
+
+        # Hold a whole-file lock while checking or writing the header
+        fcntl.lockf(fd, fcntl.LOCK_EX)
+        try:
+            if os.fstat(fd).st_size == 0:
+                os.ftruncate(fd, size)
+                os.pwrite(fd, self.HEADER.pack(
+                    self.MAGIC, self.buckets, self.ways, self.engine.width
+                ), 0)
+            header = os.pread(fd, self.HEADER.size, 0)
+        finally:
+            fcntl.lockf(fd, fcntl.LOCK_UN)
+
+        magic, buckets, ways, width = self.HEADER.unpack(header)
+        if (magic, buckets, ways, width) != (self.MAGIC, self.buckets, self.ways, self.engine.width):
+            os.close(fd)
+            raise ValueError(
+                f"Shared rate limit table {self.path} has a different layout; remove it or use another path"
+            )
+
+        self._fd = fd
+        self._map = mmap.mmap(fd, size)
+
+    def close(self):
+        """Unmap the shared table"""
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+    @staticmethod
+    def _key(client_id: str) -> int:
+        """Stable 64-bit client hash, identical in every process"""
+        digest = hashlib.blake2b(client_id.encode('utf-8'), digest_size=8).digest()
+        return int.from_bytes(digest, 'little') or 1
+
+    def for_action(self, action_id: str, max_clients: int) -> 'SharedMemoryBackend':
+        """Backend mapping a table of its own next to this one"""
+        name = re.sub(r'[^A-Za-z0-9_.-]', '_', action_id)
+        return SharedMemoryBackend(f'{self.path}.{name}', buckets=self.buckets, ways=self.ways,
+                                   stripes=len(self._locks))
+
+    def hit(self, client_id: str, now: float, cost: int = 1) -> RateLimitDecision:
+        engine = self.engine
+        return self._update(client_id, now, lambda state, now: engine.hit(state, now, cost))
+
+    def release(self, client_id: str, now: float):
+        if self.engine.concurrency is not None:
+            self._update(client_id, now, lambda state, now: self.engine.release(state))
+
+    def _update(self, client_id: str, now: float, apply: Callable):
+        """Apply `apply(state, now)` to a client's state under the bucket lock"""
+        key = self._key(client_id)
+        bucket = key % self.buckets
+        start = self.HEADER.size + bucket * self._bucket_size
+        fcntl = self._fcntl
+
+        # A bucket always maps to the same stripe, so no two threads of this
+        # process hold overlapping fcntl ranges
+        with self._locks[bucket % len(self._locks)]:
+            fcntl.lockf(self._fd, fcntl.LOCK_EX, self._bucket_size, start, os.SEEK_SET)
+            try:
+                return self._update_locked(key, start, now, apply)
+            finally:
+                fcntl.lockf(self._fd, fcntl.LOCK_UN, self._bucket_size, start, os.SEEK_SET)
+
+    def _update_locked(self, key: int, start: int, now: float, apply: Callable):
+        """Find or claim the client's slot in a locked bucket and update it"""
+        buf = self._map
+        slot = None
+        victim, victim_seen = start, None
+
+        for offset in range(start, start + self._bucket_size, self._slot_size):
+            slot_key, last_seen = self.SLOT_HEADER.unpack_from(buf, offset)
+            if slot_key == key:
+                slot = offset
+                break
+            if victim_seen is None or last_seen < victim_seen:
+                victim, victim_seen = offset, last_seen
+
+        if slot is None:
+            slot = victim
+            # Empty slots and clients idle past every window are free to reuse
+            if victim_seen and now - victim_seen < self.engine.max_window:
+                self.evicted += 1
+            state = self.engine.new_state(now)
+        else:
+            state = list(self._state.unpack_from(buf, slot + self.SLOT_HEADER.size))
+
+        result = apply(state, now)
+        self.SLOT_HEADER.pack_into(buf, slot, key, now)
+        self._state.pack_into(buf, slot + self.SLOT_HEADER.size, *state)
+        return result
+
+    def stats(self) -> Dict:
+        return {
+            'path': self.path,
+            'slots': self.buckets * self.ways,
+            'evicted': self.evicted
+        }
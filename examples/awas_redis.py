@@ -0,0 +1,599 @@
+"""
+AWAS Redis-Protocol Rate Limit Backend
+Version 1.0.0
+
+Shares rate limit counters between nodes through any store speaking the
+Redis protocol (RESP). Each check is sent as one pipelined batch over a
+pooled connection; when the store is slow or unreachable the backend
+falls back to in-process limiting until it recovers.
+
+LocalRESPServer is a small in-process stand-in implementing the commands
+used here, for development, offline runs and the test suite.
+"""
+
+import asyncio
+import logging
+import queue
+import socket
+import socketserver
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from awas_ratelimit import (
+    InProcessBackend, RateLimitBackend, RateLimitDecision, RateLimitEngine
+)
+
+logger = logging.getLogger(__name__)
+
+
+class RESPError(Exception):
+    """Error reply returned by the store"""
+
+
+class PoolExhausted(ConnectionError):
+    """Every connection allowed by the pool is in use"""
+
+
+def encode_command(*args) -> bytes:
+    """Encode a command as a RESP array of bulk strings"""
+    parts = [b'*%d\r\n' % len(args)]
+    for arg in args:
+        if not isinstance(arg, bytes):
+            arg = str(arg).encode('utf-8')
+        parts.append(b'$%d\r\n%s\r\n' % (len(arg), arg))
+    return b''.join(parts)
+
+
+def read_reply(reader):
+    """Read one RESP reply from a buffered binary reader"""
+    line = reader.readline()
+    if not line:
+        raise ConnectionError("Connection closed by store")
+
+    prefix, payload = line[:1], line[1:-2]
+    if prefix == b'+':
+        return payload.decode('utf-8')
+    if prefix == b'-':
+        return RESPError(payload.decode('utf-8'))
+    if prefix == b':':
+        return int(payload)
+    if prefix == b'$':
+        length = int(payload)
+        if length < 0:
+            return None
+        data = reader.read(length + 2)
+        return data[:-2]
+    if prefix == b'*':
+        count = int(payload)
+        if count < 0:
+            return None
+        return [read_reply(reader) for _ in range(count)]
+    raise ConnectionError(f"Invalid RESP reply: {line!r}")
+
+
+class RESPConnection:
+    """Single connection to a Redis-protocol store"""
+
+    def __init__(self, host: str, port: int, timeout: float):
+        self.sock = socket.create_connection((host, port), timeout=timeout)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.reader = self.sock.makefile('rb')
+
+    def pipeline(self, commands: List[Tuple]) -> List:
+        """Send all commands in one write and read their replies"""
+        self.sock.sendall(b''.join(encode_command(*c) for c in commands))
+        return [read_reply(self.reader) for _ in commands]
+
+    def close(self):
+        try:
+            self.reader.close()
+            self.sock.close()
+        except OSError:
+            pass
+
+
+class ConnectionPool:
+    """
+    Bounded pool of RESP connections
+
+    At most max_connections are open at once. When all are busy a caller
+    waits up to `timeout` for one, then gets PoolExhausted.
+    """
+
+    def __init__(self, host: str = 'localhost', port: int = 6379,
+                 max_connections: int = 16, timeout: float = 0.05):
+        """
+        Initialize connection pool
+
+        Args:
+            host: Store host
+            port: Store port
+            max_connections: Maximum connections open to the store
+            timeout: Connect and read timeout, and wait for a free connection, in seconds
+        """
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self._idle = queue.LifoQueue(maxsize=max_connections)
+        # One permit per connection in use; idle connections were opened under a
+        # permit, so no more than max_connections are ever open
+        self._permits = threading.BoundedSemaphore(max_connections)
+
+    def acquire(self) -> RESPConnection:
+        if not self._permits.acquire(timeout=self.timeout):
+            raise PoolExhausted(f"All {self.max_connections} store connections are busy")
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        try:
+            return RESPConnection(self.host, self.port, self.timeout)
+        except BaseException:
+            self._permits.release()
+            raise
+
+    def release(self, conn: RESPConnection):
+        self._idle.put_nowait(conn)
+        self._permits.release()
+
+    def discard(self, conn: RESPConnection):
+        """Close a connection that must not be reused"""
+        conn.close()
+        self._permits.release()
+
+    def pipeline(self, commands: List[Tuple]) -> List:
+        """Run commands in one round trip on a pooled connection"""
+        conn = self.acquire()
+        try:
+            replies = conn.pipeline(commands)
+        except BaseException:
+            # The connection state is unknown after a timeout; never reuse it
+            self.discard(conn)
+            raise
+        self.release(conn)
+        return replies
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+async def read_reply_async(reader: asyncio.StreamReader):
+    """Read one RESP reply from an asyncio stream"""
+    line = await reader.readline()
+    if not line:
+        raise ConnectionError("Connection closed by store")
+
+    prefix, payload = line[:1], line[1:-2]
+    if prefix == b'$':
+        length = int(payload)
+        if length < 0:
+            return None
+        data = await reader.readexactly(length + 2)
+        return data[:-2]
+    if prefix == b'*':
+        count = int(payload)
+        if count < 0:
+            return None
+        return [await read_reply_async(reader) for _ in range(count)]
+    if prefix == b'+':
+        return payload.decode('utf-8')
+    if prefix == b'-':
+        return RESPError(payload.decode('utf-8'))
+    if prefix == b':':
+        return int(payload)
+    raise ConnectionError(f"Invalid RESP reply: {line!r}")
+
+
+class AsyncConnectionPool:
+    """
+    Pool of asyncio RESP connections
+
+    Connections belong to the event loop that opened them, so use one
+    pool per loop. At most max_connections are open at once; when all are
+    busy a caller waits up to `timeout` for one, then gets PoolExhausted.
+    """
+
+    def __init__(self, host: str = 'localhost', port: int = 6379,
+                 max_connections: int = 16, timeout: float = 0.05):
+        """
+        Initialize asyncio connection pool
+
+        Args:
+            host: Store host
+            port: Store port
+            max_connections: Maximum connections open to the store
+            timeout: Connect and round-trip timeout, and wait for a free connection, in seconds
+        """
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self._idle = []
+        # One permit per connection in use; idle connections were opened under a
+        # permit, so no more than max_connections are ever open
+        self._permits = asyncio.Semaphore(max_connections)
+
+    async def pipeline(self, commands: List[Tuple]) -> List:
+        """Run commands in one round trip on a pooled connection"""
+        try:
+            await asyncio.wait_for(self._permits.acquire(), self.timeout)
+        except asyncio.TimeoutError:
+            raise PoolExhausted(f"All {self.max_connections} store connections are busy")
+        if self._idle:
+            reader, writer = self._idle.pop()
+        else:
+            try:
+                reader, writer = await asyncio.wait_for(
+                    asyncio.open_connection(self.host, self.port), self.timeout
+                )
+            except BaseException:
+                self._permits.release()
+                raise
+        try:
+            replies = await asyncio.wait_for(
+                self._round_trip(reader, writer, commands), self.timeout
+            )
+        except BaseException:
+            # The connection state is unknown after a timeout; never reuse it
+            writer.close()
+            self._permits.release()
+            raise
+
+        self._idle.append((reader, writer))
+        self._permits.release()
+        return replies
+
+    @staticmethod
+    async def _round_trip(reader: asyncio.StreamReader, writer: asyncio.StreamWriter,
+                          commands: List[Tuple]) -> List:
+        writer.write(b''.join(encode_command(*c) for c in commands))
+        await writer.drain()
+        return [await read_reply_async(reader) for _ in commands]
+
+    def close(self):
+        while self._idle:
+            self._idle.pop()[1].close()
+
+
+class RedisBackend(RateLimitBackend):
+    """
+    Sliding window rate limiting in a shared Redis-protocol store
+
+    Each limit is kept as one counter per fixed window. A check sends
+    INCRBY + PEXPIRE on the current window and GET on the previous one for
+    every limit in a single pipeline. As with the other backends, a
+    rejected request is not counted: its increments are given back with
+    DECRBY (pass count_rejected=True to keep them, so agents that ignore
+    429 replies stay throttled). Concurrent request limits use an
+    INCR/DECR in-flight counter per client.
+
+    When the store is unreachable, or every pooled connection is busy,
+    the check falls back to in-process limits.
+
+    Usage:
+        backend = RedisBackend(ConnectionPool('redis.internal', 6379))
+        awas = AWASMiddleware(app, rate_limit_backend=backend)
+
+        # asyncio servers
+        backend = RedisBackend(None, async_pool=AsyncConnectionPool('redis.internal', 6379))
+        awas = AWASASGIMiddleware(app, rate_limit_backend=backend)
+    """
+
+    # In-flight counters expire so a crashed worker cannot leak slots forever
+    IN_FLIGHT_TTL_MS = 600000
+
+    # Without an async_pool, asyncio servers run checks in a worker thread
+    blocking = True
+
+    def __init__(self, pool: Optional[ConnectionPool], prefix: str = 'awas:rl:',
+                 fallback: Optional[RateLimitBackend] = None,
+                 retry_interval: float = 5.0,
+                 async_pool: Optional['AsyncConnectionPool'] = None,
+                 count_rejected: bool = False):
+        """
+        Initialize Redis backend
+
+        Args:
+            pool: Connection pool for the store
+            prefix: Key prefix for rate limit counters
+            fallback: Backend used while the store is unavailable
+            retry_interval: Seconds to wait before retrying the store after a failure
+            async_pool: Connection pool used by ahit()/arelease() under asyncio
+            count_rejected: Count rejected requests against the windowed limits
+        """
+        self.pool = pool
+        self.async_pool = async_pool
+        self.prefix = prefix
+        self.fallback = fallback or InProcessBackend()
+        self.retry_interval = retry_interval
+        self.count_rejected = count_rejected
+        self.engine = None
+        self._bound = (None, {})
+        self.remote_checks = 0
+        self.fallback_checks = 0
+        self._retry_at = 0.0
+
+    def bind(self, engine: RateLimitEngine):
+        """Attach the engine; only sliding window limits are supported remotely"""
+        if engine.algorithm != 'sliding_window':
+            raise ValueError("RedisBackend supports the 'sliding_window' algorithm only")
+        self.fallback.bind(engine)
+        self._bound = (engine, {name: offset for name, _, offset in engine.limits})
+        self.engine = engine
+
+    def hit(self, client_id: str, now: float, cost: int = 1) -> RateLimitDecision:
+        if now < self._retry_at:
+            self.fallback_checks += 1
+            return self.fallback.hit(client_id, now, cost)
+
+        engine, offsets = self._bound
+        commands, windows = self._commands(engine, client_id, now, cost)
+        try:
+            replies = self._check_replies(self.pool.pipeline(commands))
+        except PoolExhausted:
+            self.fallback_checks += 1
+            return self.fallback.hit(client_id, now, cost)
+        except (OSError, ConnectionError, RESPError) as e:
+            self._fail(e, now)
+            self.fallback_checks += 1
+            return self.fallback.hit(client_id, now, cost)
+
+        self.remote_checks += 1
+        decision = self._decide(engine, offsets, windows, replies, now, cost)
+        if decision.exceeded is not None:
+            self._refund(self._refund_commands(engine, client_id, windows, cost), now)
+        return decision
+
+    async def ahit(self, client_id: str, now: float, cost: int = 1) -> RateLimitDecision:
+        """hit() over the asyncio pool, or in a worker thread without one"""
+        if self.async_pool is None:
+            return await super().ahit(client_id, now, cost)
+        if now < self._retry_at:
+            self.fallback_checks += 1
+            return self.fallback.hit(client_id, now, cost)
+
+        engine, offsets = self._bound
+        commands, windows = self._commands(engine, client_id, now, cost)
+        try:
+            replies = self._check_replies(await self.async_pool.pipeline(commands))
+        except PoolExhausted:
+            self.fallback_checks += 1
+            return self.fallback.hit(client_id, now, cost)
+        except (OSError, ConnectionError, RESPError, asyncio.TimeoutError) as e:
+            self._fail(e, now)
+            self.fallback_checks += 1
+            return self.fallback.hit(client_id, now, cost)
+
+        self.remote_checks += 1
+        decision = self._decide(engine, offsets, windows, replies, now, cost)
+        if decision.exceeded is not None:
+            await self._arefund(self._refund_commands(engine, client_id, windows, cost), now)
+        return decision
+
+    def for_action(self, action_id: str, max_clients: int) -> 'RedisBackend':
+        """Backend sharing this one's connections, with keys of its own"""
+        return RedisBackend(self.pool, prefix=f'{self.prefix}action:{action_id}:',
+                            fallback=InProcessBackend(max_entries=max_clients),
+                            retry_interval=self.retry_interval, async_pool=self.async_pool,
+                            count_rejected=self.count_rejected)
+
+    def _concurrency_key(self, client_id: str) -> str:
+        return f'{self.prefix}{client_id}:concurrent'
+
+    def _commands(self, engine: RateLimitEngine, client_id: str, now: float, cost: int):
+        """Pipeline for one check, and the (name, limiter, window index, key) of each counted limit"""
+        commands = []
+        windows = []
+        for name, limiter, _ in engine.limits:
+            if limiter is engine.concurrency:
+                continue
+            index = int(now // limiter.window)
+            key = f'{self.prefix}{client_id}:{name}:'
+            ttl_ms = int(limiter.window * 2000)
+            commands.append(('INCRBY', f'{key}{index}', cost))
+            commands.append(('PEXPIRE', f'{key}{index}', ttl_ms))
+            commands.append(('GET', f'{key}{index - 1}'))
+            windows.append((name, limiter, index, f'{key}{index}'))
+
+        if engine.concurrency is not None:
+            concurrency_key = self._concurrency_key(client_id)
+            commands.append(('INCR', concurrency_key))
+            commands.append(('PEXPIRE', concurrency_key, self.IN_FLIGHT_TTL_MS))
+        return commands, windows
+
+    @staticmethod
+    def _check_replies(replies: List) -> List:
+        for reply in replies:
+            if isinstance(reply, RESPError):
+                raise reply
+        return replies
+
+    def _refund_commands(self, engine: RateLimitEngine, client_id: str, windows: List,
+                         cost: int) -> List[Tuple]:
+        """Commands giving back what a rejected check counted"""
+        commands = []
+        if not self.count_rejected:
+            commands.extend(('DECRBY', key, cost) for _, _, _, key in windows)
+        if engine.concurrency is not None:
+            # The request will not run, so give back its in-flight slot
+            commands.append(('DECR', self._concurrency_key(client_id)))
+        return commands
+
+    def _decide(self, engine: RateLimitEngine, offsets: Dict, windows: List,
+                replies: List, now: float, cost: int) -> RateLimitDecision:
+        """Rebuild a local state from the counters to compute quota and reset"""
+        state = [0.0] * engine.width
+        exceeded = None
+        for i, (name, limiter, index, _) in enumerate(windows):
+            current, _, previous = replies[i * 3:i * 3 + 3]
+            offset = offsets[name]
+            state[offset:offset + 3] = [index * limiter.window, float(previous or 0), float(current)]
+            if exceeded is None and limiter.count(state, offset, now) > limiter.limit:
+                exceeded = name
+
+        if engine.concurrency is not None:
+            in_flight = replies[len(windows) * 3]
+            state[engine.concurrency_offset] = float(in_flight)
+            if exceeded is None and in_flight > engine.concurrency.limit:
+                exceeded = 'concurrent'
+
+        if exceeded is not None and not self.count_rejected:
+            # Report the quota as it stands once the refund is applied
+            for name, _, _, _ in windows:
+                state[offsets[name] + 2] -= cost
+        return engine.decide(state, now, exceeded)
+
+    def release(self, client_id: str, now: float):
+        if self.engine.concurrency is None:
+            return
+        if now < self._retry_at:
+            self.fallback.release(client_id, now)
+            return
+        self._decrement(self._concurrency_key(client_id), now)
+
+    async def arelease(self, client_id: str, now: float):
+        if self.async_pool is None:
+            return await super().arelease(client_id, now)
+        if self.engine.concurrency is None:
+            return
+        if now < self._retry_at:
+            self.fallback.release(client_id, now)
+            return
+        await self._adecrement(self._concurrency_key(client_id), now)
+
+    def _decrement(self, key: str, now: float):
+        """Decrement an in-flight counter"""
+        self._refund([('DECR', key)], now)
+
+    async def _adecrement(self, key: str, now: float):
+        await self._arefund([('DECR', key)], now)
+
+    def _refund(self, commands: List[Tuple], now: float):
+        """Send decrements in one round trip"""
+        if not commands:
+            return
+        try:
+            self.pool.pipeline(commands)
+        except PoolExhausted:
+            logger.warning("Rate limit store connections exhausted; counters not decremented")
+        except (OSError, ConnectionError) as e:
+            self._fail(e, now)
+
+    async def _arefund(self, commands: List[Tuple], now: float):
+        if not commands:
+            return
+        try:
+            await self.async_pool.pipeline(commands)
+        except PoolExhausted:
+            logger.warning("Rate limit store connections exhausted; counters not decremented")
+        except (OSError, ConnectionError, asyncio.TimeoutError) as e:
+            self._fail(e, now)
+
+    def _fail(self, error: Exception, now: float):
+        """Switch to local limits for the retry interval"""
+        logger.warning(f"Rate limit store unavailable, using local limits: {error}")
+        self._retry_at = now + self.retry_interval
+
+    def stats(self) -> Dict:
+        return {
+            'remote_checks': self.remote_checks,
+            'fallback_checks': self.fallback_checks,
+            'fallback': self.fallback.stats()
+        }
+
+
+class LocalRESPServer:
+    """
+    In-process stand-in for a Redis-protocol store
+
+    Supports PING, GET, SET, DEL, INCR, INCRBY, DECR, DECRBY, EXPIRE and PEXPIRE with
+    key expiry, which is everything RedisBackend needs.
+
+    Usage:
+        server = LocalRESPServer()
+        server.start()
+        backend = RedisBackend(ConnectionPool('127.0.0.1', server.port))
+    """
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0):
+        self.data = {}
+        self.expires = {}
+        self.lock = threading.Lock()
+        store = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                # Replies are written one by one; do not let Nagle hold them back
+                self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                while True:
+                    try:
+                        command = read_reply(self.rfile)
+                    except (ConnectionError, ValueError):
+                        return
+                    self.wfile.write(store.execute(command))
+
+        self.server = socketserver.ThreadingTCPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self.port = self.server.server_address[1]
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def _live(self, key: bytes) -> Optional[bytes]:
+        """Value of a key, dropping it if expired"""
+        deadline = self.expires.get(key)
+        if deadline is not None and time.time() >= deadline:
+            self.data.pop(key, None)
+            del self.expires[key]
+        return self.data.get(key)
+
+    def execute(self, command: List[bytes]) -> bytes:
+        """Execute one command and return the encoded reply"""
+        name = command[0].upper()
+        args = command[1:]
+        with self.lock:
+            if name == b'PING':
+                return b'+PONG\r\n'
+            if name == b'GET':
+                value = self._live(args[0])
+                if value is None:
+                    return b'$-1\r\n'
+                return b'$%d\r\n%s\r\n' % (len(value), value)
+            if name == b'SET':
+                self.data[args[0]] = args[1]
+                self.expires.pop(args[0], None)
+                return b'+OK\r\n'
+            if name == b'DEL':
+                removed = 0
+                for key in args:
+                    if self._live(key) is not None:
+                        del self.data[key]
+                        self.expires.pop(key, None)
+                        removed += 1
+                return b':%d\r\n' % removed
+            if name in (b'INCR', b'INCRBY', b'DECR', b'DECRBY'):
+                amount = {b'INCR': 1, b'DECR': -1, b'INCRBY': 1, b'DECRBY': -1}[name]
+                if len(args) > 1:
+                    amount *= int(args[1])
+                value = int(self._live(args[0]) or 0) + amount
+                self.data[args[0]] = str(value).encode()
+                return b':%d\r\n' % value
+            if name in (b'EXPIRE', b'PEXPIRE'):
+                if self._live(args[0]) is None:
+                    return b':0\r\n'
+                scale = 1.0 if name == b'EXPIRE' else 0.001
+                self.expires[args[0]] = time.time() + int(args[1]) * scale
+                return b':1\r\n'
+        return b"-ERR unknown command '%s'\r\n" % name
@@ -0,0 +1,100 @@
+"""
+AWAS Action Registry
+Version 1.0.0
+
+Immutable, indexed view of the actions in an AI action manifest. Built
+once per manifest load so request handling never scans the action list.
+"""
+
+from types import MappingProxyType
+from typing import Dict, Iterator, Mapping, Optional, Tuple
+
+# Secondary index name -> action field it is keyed on
+INDEXED_FIELDS = {
+    'type': 'type',
+    'intent': 'intent',
+    'sideEffect': 'sideEffect',
+    'conformanceLevel': 'conformanceLevel',
+    'endpoint': 'endpoint',
+    'method': 'method',
+}
+
+
+class ActionRegistry:
+    """
+    Lookup of manifest actions by id and by secondary attributes
+
+    Usage:
+        registry = ActionRegistry(manifest)
+        action = registry.get('add_to_cart')
+        reads = registry.find(intent='read', sideEffect='safe')
+    """
+
+    def __init__(self, manifest: Dict):
+        by_id = {}
+        indexes = {name: {} for name in INDEXED_FIELDS}
+        routes = {}
+
+        for action in manifest.get('actions', []):
+            action_id = action.get('id')
+            if action_id is None or action_id in by_id:
+                continue
+            by_id[action_id] = action
+
+            for name, field in INDEXED_FIELDS.items():
+                value = action.get(field)
+                if name == 'method' and value:
+                    value = value.upper()
+                if value is not None:
+                    indexes[name].setdefault(value, []).append(action)
+
+            method = (action.get('method') or 'GET').upper()
+            routes[(method, action.get('endpoint'))] = action
+
+        self._by_id = MappingProxyType(by_id)
+        self._indexes = MappingProxyType({
+            name: MappingProxyType({value: tuple(actions) for value, actions in index.items()})
+            for name, index in indexes.items()
+        })
+        self._routes = MappingProxyType(routes)
+
+    def __len__(self) -> int:
+        return len(self._by_id)
+
+    def __iter__(self) -> Iterator[Dict]:
+        return iter(self._by_id.values())
+
+    def __contains__(self, action_id: str) -> bool:
+        return action_id in self._by_id
+
+    @property
+    def ids(self) -> Mapping[str, Dict]:
+        """Read-only mapping of action id to action"""
+        return self._by_id
+
+    def get(self, action_id: str) -> Optional[Dict]:
+        """Get an action by id"""
+        return self._by_id.get(action_id)
+
+    def by(self, index: str, value) -> Tuple[Dict, ...]:
+        """Get the actions whose `index` field equals `value`"""
+        if index == 'method' and value:
+            value = value.upper()
+        return self._indexes[index].get(value, ())
+
+    def find(self, **criteria) -> Tuple[Dict, ...]:
+        """Get the actions matching every given index value, e.g. find(intent='read')"""
+        if not criteria:
+            return tuple(self._by_id.values())
+
+        # Start from the smallest candidate set and filter the rest
+        candidates = sorted((self.by(index, value) for index, value in criteria.items()), key=len)
+        matches = candidates[0]
+        for other in candidates[1:]:
+            ids = {id(action) for action in other}
+            matches = tuple(action for action in matches if id(action) in ids)
+        return matches
+
+    def for_route(self, method: str, endpoint: str) -> Optional[Dict]:
+        """Get the action declared for an HTTP method and endpoint"""
+        return self._routes.get((method.upper(), endpoint))
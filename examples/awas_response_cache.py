@@ -0,0 +1,146 @@
+"""
+AWAS Response Cache
+Version 1.0.0
+
+Opt-in cache for actions declared `intent: "read"` and `sideEffect:
+"safe"`. Responses are keyed on the action and its validated parameters,
+kept for the action's `cacheTtl` (shortened by the handler's
+Cache-Control max-age) and evicted least recently used first. Concurrent
+misses for the same key are coalesced so only one runs the handler.
+
+Responses to actions with `authentication_required` are also keyed on
+the caller's identity (g.user_id, or a hash of the Authorization
+header). When the middleware cannot identify the caller, the response
+is not cached.
+"""
+
+import re
+import threading
+from collections import OrderedDict
+from typing import Dict, Hashable, List, Optional, Tuple
+
+from awas_idempotency import ENTRY_OVERHEAD, SingleFlight
+
+# Cache-Control directives that forbid storing a response in a shared cache
+UNCACHEABLE_DIRECTIVES = frozenset(('no-store', 'no-cache', 'private'))
+
+MAX_AGE_PATTERN = re.compile(r'(?:^|,)\s*(s-maxage|max-age)\s*=\s*"?(\d+)"?', re.IGNORECASE)
+
+
+def cache_control_ttl(header: Optional[str], ttl: float) -> float:
+    """Limit a TTL by a response's Cache-Control header (0 means do not cache)"""
+    if not header:
+        return ttl
+    directives = {part.split('=', 1)[0].strip().lower() for part in header.split(',')}
+    if directives & UNCACHEABLE_DIRECTIVES:
+        return 0
+
+    # s-maxage takes precedence over max-age for a shared cache
+    ages = dict((name.lower(), int(value)) for name, value in MAX_AGE_PATTERN.findall(header))
+    max_age = ages.get('s-maxage', ages.get('max-age'))
+    if max_age is not None:
+        return min(ttl, max_age)
+    return ttl
+
+
+class CachedResponse:
+    """Status, headers and body of a cached read"""
+
+    __slots__ = ('status', 'headers', 'body', 'stored', 'expires', 'size')
+
+    def __init__(self, status: int, headers: List[Tuple[str, str]], body: bytes,
+                 stored: float, expires: float):
+        self.status = status
+        self.headers = headers
+        self.body = body
+        self.stored = stored
+        self.expires = expires
+        self.size = ENTRY_OVERHEAD + len(body) + sum(len(k) + len(v) for k, v in headers)
+
+
+class ResponseCache:
+    """
+    LRU cache of safe read responses with per-entry expiry
+
+    Usage:
+        cache = ResponseCache(max_entries=5000, max_bytes=64 * 1024 * 1024)
+        awas = AWASMiddleware(app, response_cache=cache)
+    """
+
+    def __init__(self, max_entries: int = 1000, max_bytes: int = 32 * 1024 * 1024,
+                 default_ttl: float = 0, wait_timeout: float = 5.0):
+        """
+        Initialize response cache
+
+        Args:
+            max_entries: Maximum number of cached responses
+            max_bytes: Approximate memory budget for cached responses
+            default_ttl: TTL for safe reads without a cacheTtl (0 caches only declared actions)
+            wait_timeout: Seconds a concurrent miss waits for the one filling the entry
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        self.wait_timeout = wait_timeout
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evicted = 0
+        self.flights = SingleFlight()
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, now: float) -> Optional[CachedResponse]:
+        """Return the cached response for a key if it has not expired"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires <= now:
+                del self._entries[key]
+                self.bytes -= entry.size
+                self.expired += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key: Hashable, entry: CachedResponse) -> bool:
+        """Cache a response; returns False if it is too large for the budget"""
+        if entry.size > self.max_bytes:
+            return False
+
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.bytes -= previous.size
+            self._entries[key] = entry
+            self.bytes += entry.size
+
+            while self.bytes > self.max_bytes or len(self._entries) > self.max_entries:
+                _, evicted = self._entries.popitem(last=False)
+                self.bytes -= evicted.size
+                self.evicted += 1
+        return True
+
+    def clear(self):
+        """Drop every cached response"""
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def stats(self) -> Dict:
+        """Report cache size and counters"""
+        return {
+            'entries': len(self._entries),
+            'bytes': self.bytes,
+            'max_entries': self.max_entries,
+            'max_bytes': self.max_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'expired': self.expired,
+            'evicted': self.evicted,
+            **self.flights.stats()
+        }
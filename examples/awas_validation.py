@@ -0,0 +1,451 @@
+"""
+AWAS Input Validation
+Version 1.0.0
+
+Compiles an action's `inputs` definitions and `inputSchema` into a
+validator once, at manifest load. Regexes are precompiled, enums become
+frozensets and types are resolved ahead of time, so a request only runs
+the checks.
+"""
+
+import hashlib
+import json
+import re
+from typing import Callable, Dict, List, Optional
+
+TYPE_VALIDATORS = {
+    'string': str,
+    'integer': int,
+    'number': (int, float),
+    'boolean': bool,
+    'array': list,
+    'object': dict
+}
+
+Validator = Callable[[Dict], List[str]]
+Rule = Callable[[object], Optional[str]]
+
+
+def _pattern_rule(label: str, pattern: str, anchored: bool = True) -> Rule:
+    compiled = re.compile(pattern)
+    match = compiled.match if anchored else compiled.search
+    error = f"{label} does not match required pattern"
+
+    def rule(value):
+        if isinstance(value, str) and not match(value):
+            return error
+    return rule
+
+
+def _bound_rule(label: str, bound, is_min: bool) -> Rule:
+    error = f"{label} must be {'>=' if is_min else '<='} {bound}"
+
+    def rule(value):
+        if isinstance(value, (int, float)) and (value < bound if is_min else value > bound):
+            return error
+    return rule
+
+
+def _length_rule(label: str, bound, is_min: bool) -> Rule:
+    error = f"{label} must have length {'>=' if is_min else '<='} {bound}"
+
+    def rule(value):
+        if isinstance(value, (str, list)) and (len(value) < bound if is_min else len(value) > bound):
+            return error
+    return rule
+
+
+def _enum_rule(label: str, allowed: List) -> Rule:
+    error = f"{label} must be one of: {', '.join(map(str, allowed))}"
+    try:
+        choices = frozenset(allowed)
+    except TypeError:
+        choices = tuple(allowed)
+
+    def rule(value):
+        try:
+            if value in choices:
+                return None
+        except TypeError:
+            # Unhashable values (lists, dicts) can never be in a frozenset enum
+            if value in allowed:
+                return None
+        return error
+    return rule
+
+
+def compile_inputs(inputs: List[Dict]) -> Validator:
+    """
+    Compile `inputs` definitions into a validator
+
+    Returns:
+        Function taking the request parameters and returning a list of errors
+    """
+    plan = []
+    for input_def in inputs:
+        name = input_def.get('name')
+        param_type = input_def.get('type', 'string')
+        validation = input_def.get('validation', {})
+        label = f"Parameter '{name}'"
+
+        rules = []
+        if validation:
+            if 'pattern' in validation:
+                rules.append(_pattern_rule(label, validation['pattern']))
+            if 'min' in validation:
+                rules.append(_bound_rule(label, validation['min'], True))
+            if 'max' in validation:
+                rules.append(_bound_rule(label, validation['max'], False))
+            if 'minLength' in validation:
+                rules.append(_length_rule(label, validation['minLength'], True))
+            if 'maxLength' in validation:
+                rules.append(_length_rule(label, validation['maxLength'], False))
+            if 'enum' in validation:
+                rules.append(_enum_rule(label, validation['enum']))
+
+        plan.append((
+            name,
+            input_def.get('required', False),
+            TYPE_VALIDATORS.get(param_type),
+            f"Parameter '{name}' is required",
+            f"Parameter '{name}' should be {param_type}",
+            tuple(rules)
+        ))
+    plan = tuple(plan)
+
+    def validate(data: Dict) -> List[str]:
+        errors = []
+        for name, required, expected_type, required_error, type_error, rules in plan:
+            value = data.get(name)
+            if value is None:
+                if required:
+                    errors.append(required_error)
+                continue
+
+            if expected_type and not isinstance(value, expected_type):
+                errors.append(type_error)
+                continue
+
+            for rule in rules:
+                error = rule(value)
+                if error:
+                    errors.append(error)
+        return errors
+
+    return validate
+
+
+JSON_TYPES = {
+    'string': lambda v: isinstance(v, str),
+    'integer': lambda v: (isinstance(v, int) and not isinstance(v, bool))
+    or (isinstance(v, float) and v.is_integer()),
+    'number': lambda v: isinstance(v, (int, float)) and not isinstance(v, bool),
+    'boolean': lambda v: isinstance(v, bool),
+    'array': lambda v: isinstance(v, list),
+    'object': lambda v: isinstance(v, dict),
+    'null': lambda v: v is None,
+}
+
+Check = Callable[[object, List[str]], None]
+
+
+class CompiledSchema:
+    """
+    JSON Schema compiled into nested checks
+
+    Supports the draft-07 subset used by AWAS manifests: type, enum,
+    const, properties, required, additionalProperties, items, minItems,
+    maxItems, minLength, maxLength, pattern, minimum, maximum,
+    exclusiveMinimum, exclusiveMaximum, multipleOf, allOf, anyOf, oneOf,
+    not, local $ref into definitions, and default on top-level properties.
+    Every error message is built at compile time.
+    """
+
+    def __init__(self, schema: Dict):
+        self.schema = schema
+        self._refs = {}
+        # A boolean schema (true/false) has no properties to take defaults from
+        properties = schema.get('properties', {}) if isinstance(schema, dict) else {}
+        self.defaults = {
+            name: prop['default']
+            for name, prop in properties.items()
+            if isinstance(prop, dict) and 'default' in prop
+        }
+        self._check = self._compile(schema, '')
+
+    def validate(self, instance) -> List[str]:
+        """Validate an instance, collecting every error in one pass"""
+        errors = []
+        self._check(instance, errors)
+        return errors
+
+    @staticmethod
+    def _label(path: str) -> str:
+        return f"Parameter '{path}'" if path else "Request parameters"
+
+    def _resolve(self, ref: str) -> Dict:
+        if not ref.startswith('#'):
+            raise ValueError(f"Only local $ref is supported: {ref}")
+        node = self.schema
+        for part in ref.lstrip('#/').split('/'):
+            if part:
+                node = node[part.replace('~1', '/').replace('~0', '~')]
+        return node
+
+    def _compile_ref(self, ref: str, path: str) -> Check:
+        # The holder lets recursive definitions refer to themselves
+        if ref not in self._refs:
+            holder = []
+            self._refs[ref] = holder
+            holder.append(self._compile(self._resolve(ref), path))
+        holder = self._refs[ref]
+        return lambda value, errors: holder[0](value, errors)
+
+    def _compile(self, schema, path: str) -> Check:
+        """Compile one schema node into a check function"""
+        if schema is True or schema == {}:
+            return lambda value, errors: None
+        if schema is False:
+            error = f"{self._label(path)} is not allowed"
+            return lambda value, errors: errors.append(error)
+
+        label = self._label(path)
+        checks = []
+
+        if '$ref' in schema:
+            # In draft-07, $ref overrides sibling keywords
+            return self._compile_ref(schema['$ref'], path)
+
+        types = schema.get('type')
+        if types is not None:
+            names = [types] if isinstance(types, str) else list(types)
+            predicates = tuple(JSON_TYPES[name] for name in names if name in JSON_TYPES)
+            type_error = f"{label} should be {' or '.join(names)}"
+
+            # A type mismatch makes the remaining keywords meaningless
+            type_check = (predicates[0] if len(predicates) == 1
+                          else lambda v: any(p(v) for p in predicates))
+        else:
+            type_check = None
+
+        if 'enum' in schema:
+            checks.append(_enum_rule(label, schema['enum']))
+
+        if 'const' in schema:
+            const = schema['const']
+            const_error = f"{label} must be {const}"
+            checks.append(lambda v: const_error if v != const else None)
+
+        if 'pattern' in schema:
+            # JSON Schema patterns are unanchored, unlike legacy `validation` patterns
+            checks.append(_pattern_rule(label, schema['pattern'], anchored=False))
+        if 'minLength' in schema:
+            checks.append(_string_length(label, schema['minLength'], True))
+        if 'maxLength' in schema:
+            checks.append(_string_length(label, schema['maxLength'], False))
+
+        for keyword, op in (('minimum', '>='), ('maximum', '<='),
+                            ('exclusiveMinimum', '>'), ('exclusiveMaximum', '<')):
+            if keyword in schema:
+                checks.append(_number_bound(label, schema[keyword], op))
+        if 'multipleOf' in schema:
+            factor = schema['multipleOf']
+            multiple_error = f"{label} must be a multiple of {factor}"
+            checks.append(lambda v: multiple_error
+                          if _is_number(v) and abs(v / factor - round(v / factor)) > 1e-9 else None)
+
+        if 'minItems' in schema:
+            checks.append(_array_length(label, schema['minItems'], True))
+        if 'maxItems' in schema:
+            checks.append(_array_length(label, schema['maxItems'], False))
+
+        rules = tuple(checks)
+        structural = []
+
+        if 'properties' in schema or 'required' in schema or 'additionalProperties' in schema:
+            structural.append(self._compile_object(schema, path))
+        if 'items' in schema:
+            structural.append(self._compile_items(schema['items'], path))
+        for keyword in ('allOf', 'anyOf', 'oneOf', 'not'):
+            if keyword in schema:
+                structural.append(self._compile_combinator(keyword, schema[keyword], path, label))
+        structural = tuple(structural)
+
+        def check(value, errors):
+            if type_check is not None and not type_check(value):
+                errors.append(type_error)
+                return
+            for rule in rules:
+                error = rule(value)
+                if error:
+                    errors.append(error)
+            for nested in structural:
+                nested(value, errors)
+
+        return check
+
+    def _compile_object(self, schema: Dict, path: str) -> Check:
+        prefix = f"{path}." if path else ''
+        properties = tuple(
+            (name, self._compile(prop, prefix + name))
+            for name, prop in schema.get('properties', {}).items()
+        )
+        required = tuple(
+            (name, f"{self._label(prefix + name)} is required")
+            for name in schema.get('required', [])
+        )
+
+        additional = schema.get('additionalProperties', True)
+        known = frozenset(schema.get('properties', {}))
+        if additional is True:
+            extra = None
+        else:
+            extra = self._compile(additional, prefix + '*')
+
+        def check(value, errors):
+            if not isinstance(value, dict):
+                return
+            for name, error in required:
+                if value.get(name) is None:
+                    errors.append(error)
+            for name, nested in properties:
+                item = value.get(name)
+                if item is not None:
+                    nested(item, errors)
+            if extra is not None:
+                for name in value:
+                    if name not in known:
+                        if additional is False:
+                            errors.append(f"Unexpected parameter '{prefix}{name}'")
+                        else:
+                            extra(value[name], errors)
+
+        return check
+
+    def _compile_items(self, items, path: str) -> Check:
+        if isinstance(items, list):
+            positional = tuple(self._compile(item, f"{path}[{i}]") for i, item in enumerate(items))
+
+            def check(value, errors):
+                if isinstance(value, list):
+                    for nested, item in zip(positional, value):
+                        nested(item, errors)
+            return check
+
+        nested = self._compile(items, f"{path}[]")
+
+        def check(value, errors):
+            if isinstance(value, list):
+                for item in value:
+                    nested(item, errors)
+        return check
+
+    def _compile_combinator(self, keyword: str, subschemas, path: str, label: str) -> Check:
+        if keyword == 'not':
+            negated = self._compile(subschemas, path)
+            not_error = f"{label} matches a disallowed schema"
+
+            def check(value, errors):
+                probe = []
+                negated(value, probe)
+                if not probe:
+                    errors.append(not_error)
+            return check
+
+        compiled = tuple(self._compile(sub, path) for sub in subschemas)
+        if keyword == 'allOf':
+            def check(value, errors):
+                for nested in compiled:
+                    nested(value, errors)
+            return check
+
+        combinator_error = (f"{label} does not match any allowed schema" if keyword == 'anyOf'
+                            else f"{label} must match exactly one allowed schema")
+
+        def check(value, errors):
+            matches = 0
+            for nested in compiled:
+                probe = []
+                nested(value, probe)
+                if not probe:
+                    matches += 1
+                    if keyword == 'anyOf':
+                        return
+            if matches != 1:
+                errors.append(combinator_error)
+        return check
+
+
+def _is_number(value) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _string_length(label: str, bound: int, is_min: bool) -> Rule:
+    error = f"{label} must have length {'>=' if is_min else '<='} {bound}"
+    return lambda v: error if isinstance(v, str) and (
+        len(v) < bound if is_min else len(v) > bound) else None
+
+
+def _array_length(label: str, bound: int, is_min: bool) -> Rule:
+    error = f"{label} must have {'at least' if is_min else 'at most'} {bound} items"
+    return lambda v: error if isinstance(v, list) and (
+        len(v) < bound if is_min else len(v) > bound) else None
+
+
+NUMBER_BOUNDS = {
+    '>=': lambda v, b: v >= b,
+    '<=': lambda v, b: v <= b,
+    '>': lambda v, b: v > b,
+    '<': lambda v, b: v < b,
+}
+
+
+def _number_bound(label: str, bound, op: str) -> Rule:
+    error = f"{label} must be {op} {bound}"
+    holds = NUMBER_BOUNDS[op]
+    return lambda v: error if _is_number(v) and not holds(v, bound) else None
+
+
+_schema_cache = {}
+
+
+def compile_schema(schema: Dict) -> CompiledSchema:
+    """Compile a JSON Schema, reusing the result for identical schemas"""
+    key = hashlib.sha256(json.dumps(schema, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+    compiled = _schema_cache.get(key)
+    if compiled is None:
+        compiled = _schema_cache.setdefault(key, CompiledSchema(schema))
+    return compiled
+
+
+class ActionValidator:
+    """Validator for one action's `inputs` and `inputSchema`"""
+
+    def __init__(self, action: Dict):
+        self._inputs = compile_inputs(action.get('inputs', []))
+        schema = action.get('inputSchema')
+        self._schema = compile_schema(schema) if schema else None
+        self.defaults = self._schema.defaults if self._schema else {
+            input_def['name']: input_def['default']
+            for input_def in action.get('inputs', []) if 'default' in input_def
+        }
+
+    def __call__(self, data: Dict) -> List[str]:
+        """Validate request parameters, returning every error"""
+        errors = self._inputs(data)
+        if self._schema is not None:
+            # Both definitions often describe the same rule with the same message
+            seen = set(errors)
+            for error in self._schema.validate(data):
+                if error not in seen:
+                    seen.add(error)
+                    errors.append(error)
+        return errors
+
+    def apply_defaults(self, data: Dict) -> Dict:
+        """Request parameters with declared defaults filled in"""
+        if not self.defaults:
+            return data
+        params = dict(self.defaults)
+        params.update((name, value) for name, value in data.items() if value is not None)
+        return params
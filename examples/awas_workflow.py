@@ -0,0 +1,234 @@
+"""
+AWAS Workflow Engine
+Version 1.0.0
+
+Runs the action steps of a manifest workflow in one request. Each
+workflow is compiled into a dependency graph when the manifest loads:
+
+- a step waits for earlier steps whose declared outputs (outputSchema
+  properties) it takes as inputs
+- steps that are not safe reads keep their manifest order
+- a conditional runs after its `step` (a 0-based index into `steps`) and
+  calls `on_true` or `on_false` depending on its `condition`, an
+  expression over the workflow inputs and step outputs compiled with
+  awas_expressions
+
+Steps with no dependency between them run concurrently. Outputs are
+passed forward: a step's parameters are the workflow inputs, overridden
+by the outputs of the steps it depends on, overridden by the parameters
+given for its action, each restricted to the inputs the action declares.
+"""
+
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from awas_expressions import ExpressionError, compile_expression
+from awas_registry import ActionRegistry
+
+# call(action_id, params) -> (status, body) runs one step
+StepCall = Callable[[str, Dict], Tuple[int, object]]
+Condition = Callable[[Dict], bool]
+# submit(fn, *args) -> Future schedules a step call
+Submit = Callable[..., Future]
+
+
+class WorkflowError(ValueError):
+    """A workflow definition that cannot be compiled"""
+
+
+def compile_condition(condition: str) -> Condition:
+    """Compile a condition expression (see awas_expressions) evaluated against step outputs"""
+    try:
+        expression = compile_expression(condition)
+    except ExpressionError as e:
+        raise WorkflowError(f"Invalid condition {condition!r}: {e}")
+    return lambda namespace: bool(expression(namespace))
+
+
+def action_inputs(action: Dict) -> frozenset:
+    """Names of the parameters an action declares"""
+    names = {input_def['name'] for input_def in action.get('inputs', []) if 'name' in input_def}
+    names.update((action.get('inputSchema') or {}).get('properties', {}))
+    return frozenset(names)
+
+
+def action_outputs(action: Dict) -> frozenset:
+    """Names of the response fields an action declares"""
+    return frozenset((action.get('outputSchema') or {}).get('properties', {}))
+
+
+def _is_safe(action: Dict) -> bool:
+    return action.get('intent') == 'read' and action.get('sideEffect') == 'safe'
+
+
+class WorkflowStep:
+    """One node of a compiled workflow: an action, or a conditional choosing one"""
+
+    __slots__ = ('index', 'action_id', 'branches', 'condition', 'expression',
+                 'inputs', 'outputs', 'safe', 'depends')
+
+    def __init__(self, index: int, actions: List[Optional[Dict]],
+                 condition: Optional[Condition] = None, expression: Optional[str] = None):
+        present = [action for action in actions if action is not None]
+        self.index = index
+        self.action_id = actions[0]['id'] if condition is None else None
+        self.branches = tuple(action and action['id'] for action in actions)
+        self.condition = condition
+        self.expression = expression
+        self.inputs = frozenset().union(*(action_inputs(action) for action in present))
+        self.outputs = frozenset().union(*(action_outputs(action) for action in present))
+        self.safe = all(_is_safe(action) for action in present)
+        self.depends = ()
+
+
+class Workflow:
+    """
+    A manifest workflow compiled against an action registry
+
+    Usage:
+        workflow = compiled.workflows['checkout']
+        results, failure = workflow.run(call, inputs, params, executor.submit)
+    """
+
+    def __init__(self, definition: Dict, registry: ActionRegistry):
+        self.id = definition.get('id')
+        self.name = definition.get('name')
+        steps = definition.get('steps') or []
+        if not self.id or not steps:
+            raise WorkflowError("Workflow requires an id and steps")
+
+        def lookup(action_id: Optional[str]) -> Optional[Dict]:
+            if action_id is None:
+                return None
+            action = registry.get(action_id)
+            if action is None:
+                raise WorkflowError(f"Unknown action in workflow {self.id}: {action_id}")
+            return action
+
+        conditionals = {}
+        for conditional in definition.get('conditionals', []):
+            step = conditional.get('step')
+            if not isinstance(step, int) or not 0 <= step < len(steps):
+                raise WorkflowError(f"Conditional step out of range in workflow {self.id}: {step!r}")
+            conditionals.setdefault(step, []).append(conditional)
+
+        # Conditionals follow the step they are attached to
+        nodes = []
+        for position, action_id in enumerate(steps):
+            nodes.append(WorkflowStep(len(nodes), [lookup(action_id)]))
+            for conditional in conditionals.get(position, ()):
+                expression = conditional.get('condition')
+                nodes.append(WorkflowStep(
+                    len(nodes),
+                    [lookup(conditional.get('on_true')), lookup(conditional.get('on_false'))],
+                    condition=compile_condition(expression),
+                    expression=expression
+                ))
+
+        for node in nodes:
+            earlier = nodes[:node.index]
+            if node.condition is not None:
+                # A condition may read any output produced so far
+                node.depends = tuple(other.index for other in earlier)
+            else:
+                node.depends = tuple(
+                    other.index for other in earlier
+                    if other.outputs & node.inputs or not (other.safe or node.safe)
+                )
+
+        self.steps = tuple(nodes)
+        self.action_ids = frozenset(
+            action_id for node in nodes for action_id in node.branches if action_id is not None
+        )
+        # Number of actions a run can call, for rate limiting
+        self.size = len(nodes)
+
+    def run(self, call: StepCall, inputs: Dict, params: Dict[str, Dict],
+            submit: Submit) -> Tuple[List[Dict], Optional[Dict]]:
+        """
+        Run the workflow, submitting ready steps to run concurrently
+
+        A step answering with status 400 or above fails the workflow:
+        steps already running finish and the rest are skipped. Returns
+        the per-step results in step order and the failed step's result
+        (None if every step succeeded).
+        """
+        results = [None] * len(self.steps)
+        bodies = {}
+        outputs = {}
+        done = set()
+        running = {}
+        failure = None
+        waiting = list(self.steps)
+
+        while waiting or running:
+            if failure is None:
+                ready = [node for node in waiting if done.issuperset(node.depends)]
+                for node in ready:
+                    waiting.remove(node)
+                    result, step_params = self._resolve(node, inputs, params, bodies, outputs)
+                    if result['action_id'] is None:
+                        results[node.index] = result
+                        done.add(node.index)
+                    else:
+                        future = submit(call, result['action_id'], step_params)
+                        running[future] = (node, result)
+                if not running and any(done.issuperset(node.depends) for node in waiting):
+                    # A conditional without an action for its outcome unblocked more steps
+                    continue
+            elif waiting:
+                for node in waiting:
+                    results[node.index] = {"step": node.index, "action_id": node.action_id,
+                                           "skipped": True}
+                waiting = []
+
+            if not running:
+                break
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                node, result = running.pop(future)
+                result['status'], result['body'] = future.result()
+                results[node.index] = result
+                bodies[node.index] = outputs[result['action_id']] = result['body']
+                done.add(node.index)
+                if failure is None and result['status'] >= 400:
+                    failure = result
+
+        return results, failure
+
+    def _resolve(self, node: WorkflowStep, inputs: Dict, params: Dict[str, Dict],
+                 bodies: Dict[int, object], outputs: Dict) -> Tuple[Dict, Dict]:
+        """Choose a ready step's action and build its parameters"""
+        result = {"step": node.index}
+        action_id = node.action_id
+        if node.condition is not None:
+            chosen = node.condition({'inputs': inputs, **outputs})
+            result['condition'] = chosen
+            action_id = node.branches[0 if chosen else 1]
+        result['action_id'] = action_id
+        if action_id is None:
+            return result, {}
+
+        step_params = {name: value for name, value in inputs.items() if name in node.inputs}
+        for index in node.depends:
+            body = bodies.get(index)
+            if isinstance(body, dict):
+                step_params.update(
+                    (name, value) for name, value in body.items() if name in node.inputs
+                )
+        step_params.update(params.get(action_id) or {})
+        return result, step_params
+
+
+def compile_workflows(definitions: Iterable[Dict], registry: ActionRegistry,
+                      on_error: Callable[[Dict, WorkflowError], None]) -> Dict[str, Workflow]:
+    """Compile the manifest's workflows, reporting and skipping invalid ones"""
+    workflows = {}
+    for definition in definitions:
+        try:
+            workflow = Workflow(definition, registry)
+        except WorkflowError as e:
+            on_error(definition, e)
+            continue
+        workflows.setdefault(workflow.id, workflow)
+    return workflows
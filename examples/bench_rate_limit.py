@@ -0,0 +1,93 @@
+"""
+AWAS Rate Limiter Stress Benchmark
+
+Hammers each rate limit backend from many threads and checks that the
+number of allowed requests per client matches the configured limit
+exactly, then reports throughput.
+
+Usage:
+    python examples/bench_rate_limit.py --threads 64 --requests 2000
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+from awas_ratelimit import InProcessBackend, RateLimitEngine, SharedMemoryBackend
+
+
+def stress(backend, threads: int, requests_per_thread: int, clients: int, limit: int) -> bool:
+    """Run the stress test against one backend and print the result"""
+    engine = RateLimitEngine([('minute', limit, 60), ('burst', limit, 10)])
+    backend.bind(engine)
+
+    # A fixed clock keeps every hit inside the same window
+    now = time.time()
+    allowed = [[0] * clients for _ in range(threads)]
+    errors = []
+    start = threading.Barrier(threads + 1)
+
+    def worker(index: int):
+        counts = allowed[index]
+        start.wait()
+        try:
+            for i in range(requests_per_thread):
+                client = (index + i) % clients
+                if backend.hit(f'agent-{client}', now).exceeded is None:
+                    counts[client] += 1
+        except Exception as e:
+            errors.append(e)
+
+    workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    for t in workers:
+        t.start()
+    start.wait()
+    began = time.perf_counter()
+    for t in workers:
+        t.join()
+    elapsed = time.perf_counter() - began
+
+    attempts = [0] * clients
+    for index in range(threads):
+        for i in range(requests_per_thread):
+            attempts[(index + i) % clients] += 1
+    expected = [min(limit, n) for n in attempts]
+    totals = [sum(counts[c] for counts in allowed) for c in range(clients)]
+    ok = not errors and totals == expected
+
+    total_requests = threads * requests_per_thread
+    print(f"{type(backend).__name__:<22} {total_requests / elapsed:>12,.0f} req/s  "
+          f"allowed per client: {min(totals)}..{max(totals)} "
+          f"(expected {min(expected)}..{max(expected)})  "
+          f"{'OK' if ok else 'FAIL'}")
+    for error in errors[:3]:
+        print(f"  worker error: {error!r}")
+    return ok
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--threads', type=int, default=64)
+    parser.add_argument('--requests', type=int, default=2000, help='requests per thread')
+    parser.add_argument('--clients', type=int, default=32)
+    parser.add_argument('--limit', type=int, default=1000, help='allowed requests per client')
+    args = parser.parse_args()
+
+    # Small switch interval to force as many thread interleavings as possible
+    sys.setswitchinterval(1e-6)
+
+    ok = stress(InProcessBackend(), args.threads, args.requests, args.clients, args.limit)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        backend = SharedMemoryBackend(os.path.join(tmp, 'ratelimit'))
+        ok = stress(backend, args.threads, args.requests, args.clients, args.limit) and ok
+        backend.close()
+
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
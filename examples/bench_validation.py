@@ -0,0 +1,140 @@
+"""
+AWAS Input Validation Microbenchmark
+
+Compares the compiled validators from awas_validation against the
+previous interpreter-style validation, which re-read every input
+definition and recompiled regexes on each request. Both must return
+identical errors for every case before timings are reported.
+
+Usage:
+    python examples/bench_validation.py --iterations 100000
+"""
+
+import argparse
+import sys
+import timeit
+from typing import Dict
+
+from awas_validation import compile_inputs
+
+ACTION = {
+    'id': 'create_listing',
+    'inputs': [
+        {'name': 'sku', 'type': 'string', 'required': True,
+         'validation': {'pattern': '^[A-Z]{3}-[0-9]{4}$'}},
+        {'name': 'title', 'type': 'string', 'required': True,
+         'validation': {'minLength': 3, 'maxLength': 80}},
+        {'name': 'quantity', 'type': 'integer', 'required': False,
+         'validation': {'min': 1, 'max': 10}},
+        {'name': 'price', 'type': 'number', 'required': True,
+         'validation': {'min': 0}},
+        {'name': 'category', 'type': 'string', 'required': False,
+         'validation': {'enum': ['electronics', 'clothing', 'home', 'books']}},
+        {'name': 'tags', 'type': 'array', 'required': False,
+         'validation': {'maxLength': 5}},
+        {'name': 'gift', 'type': 'boolean', 'required': False},
+    ]
+}
+
+CASES = [
+    {'sku': 'ABC-1234', 'title': 'Laptop stand', 'quantity': 2, 'price': 29.99,
+     'category': 'home', 'tags': ['desk'], 'gift': False},
+    {'sku': 'abc-12', 'title': 'No', 'quantity': 20, 'price': -1,
+     'category': 'toys', 'tags': ['a', 'b', 'c', 'd', 'e', 'f']},
+    {'title': 42, 'quantity': '3', 'category': ['home']},
+    {},
+]
+
+
+def legacy_validate_inputs(action: Dict, data: Dict) -> Dict:
+    """Per-request interpreter-style validation used before compile_inputs"""
+    errors = []
+    inputs = action.get('inputs', [])
+
+    for input_def in inputs:
+        name = input_def.get('name')
+        required = input_def.get('required', False)
+        param_type = input_def.get('type', 'string')
+        validation = input_def.get('validation', {})
+
+        value = data.get(name)
+
+        # Check required
+        if required and value is None:
+            errors.append(f"Parameter '{name}' is required")
+            continue
+
+        if value is None:
+            continue
+
+        # Type validation
+        type_validators = {
+            'string': str,
+            'integer': int,
+            'number': (int, float),
+            'boolean': bool,
+            'array': list,
+            'object': dict
+        }
+
+        expected_type = type_validators.get(param_type)
+        if expected_type and not isinstance(value, expected_type):
+            errors.append(f"Parameter '{name}' should be {param_type}")
+            continue
+
+        # Validation rules
+        if validation:
+            # Pattern validation
+            if 'pattern' in validation and isinstance(value, str):
+                import re
+                if not re.match(validation['pattern'], value):
+                    errors.append(f"Parameter '{name}' does not match required pattern")
+
+            # Range validation
+            if isinstance(value, (int, float)):
+                if 'min' in validation and value < validation['min']:
+                    errors.append(f"Parameter '{name}' must be >= {validation['min']}")
+                if 'max' in validation and value > validation['max']:
+                    errors.append(f"Parameter '{name}' must be <= {validation['max']}")
+
+            # Length validation
+            if isinstance(value, (str, list)):
+                if 'minLength' in validation and len(value) < validation['minLength']:
+                    errors.append(f"Parameter '{name}' must have length >= {validation['minLength']}")
+                if 'maxLength' in validation and len(value) > validation['maxLength']:
+                    errors.append(f"Parameter '{name}' must have length <= {validation['maxLength']}")
+
+            # Enum validation
+            if 'enum' in validation and value not in validation['enum']:
+                errors.append(f"Parameter '{name}' must be one of: {', '.join(map(str, validation['enum']))}")
+
+    return {
+        'valid': len(errors) == 0,
+        'errors': errors
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--iterations', type=int, default=100000)
+    args = parser.parse_args()
+
+    validate = compile_inputs(ACTION['inputs'])
+
+    for data in CASES:
+        expected = legacy_validate_inputs(ACTION, data)['errors']
+        if validate(data) != expected:
+            print(f"Mismatch for {data!r}:\n  legacy:   {expected}\n  compiled: {validate(data)}")
+            return 1
+
+    for label, data in (('valid request', CASES[0]), ('invalid request', CASES[1])):
+        legacy = timeit.timeit(lambda: legacy_validate_inputs(ACTION, data), number=args.iterations)
+        compiled = timeit.timeit(lambda: validate(data), number=args.iterations)
+        per_call = 1e6 / args.iterations
+        print(f"{label:<16} legacy {legacy * per_call:7.2f} us  "
+              f"compiled {compiled * per_call:7.2f} us  speedup {legacy / compiled:4.1f}x")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,193 @@
+import json
+import os
+
+import pytest
+
+from awas_audit import (
+    SEGMENT_MAGIC, TRAILER, AuditSegment, SegmentAuditSink, decode_record, encode_record,
+    list_segments
+)
+from awas_audit_query import query
+
+RECORDS = [
+    (1000.0, 'search_products', 'Claude', '10.0.0.1', 'u1', {'q': 'laptop'}),
+    (1001.5, 'add_to_cart', 'Claude', '10.0.0.1', 'u1', {'product_id': 'p1', 'quantity': 2}),
+    (1002.0, 'add_to_cart', 'AtlasBot', None, 'u2', {'product_id': 'p2'}),
+    (1003.0, 'search_products', 'AtlasBot', '10.0.0.2', 'anonymous', {'q': 'héadphones'}),
+    (1004.0, 'add_to_cart', 'Claude', '10.0.0.1', 'u2', {'product_id': 'p3', 'note': None}),
+]
+
+
+def write_segments(directory, records=RECORDS, **kwargs):
+    sink = SegmentAuditSink(str(directory), flush_interval=0.01, **kwargs)
+    for record in records:
+        sink.submit(record)
+    sink.close()
+    return list_segments(str(directory))
+
+
+@pytest.fixture
+def segment_path(tmp_path):
+    paths = write_segments(tmp_path)
+    assert len(paths) == 1
+    return paths[0]
+
+
+def truncated_copy(path, size):
+    with open(path, 'rb') as f:
+        data = f.read()[:size]
+    copy = path + '.partial'
+    with open(copy, 'wb') as f:
+        f.write(data)
+    return copy
+
+
+def record_offsets(path):
+    """Start offset of every record, and where the records end"""
+    with AuditSegment(path) as segment:
+        return list(segment._scan(segment.records_end)), segment.records_end
+
+
+def test_encode_decode_round_trip():
+    for record in RECORDS:
+        assert decode_record(encode_record(record), 0) == record
+
+
+def test_encode_record_length_prefix():
+    entry = encode_record(RECORDS[0])
+    assert int.from_bytes(entry[:4], 'little') == len(entry) - 4
+
+
+def test_decode_record_at_offset():
+    buffer = b''.join(encode_record(record) for record in RECORDS[:2])
+    assert decode_record(buffer, len(encode_record(RECORDS[0]))) == RECORDS[1]
+
+
+def test_closed_segment_is_indexed(segment_path):
+    with AuditSegment(segment_path) as segment:
+        assert segment.indexed
+        assert segment.count == len(RECORDS)
+        assert (segment.min_ts, segment.max_ts) == (1000.0, 1004.0)
+        assert list(segment.query()) == RECORDS
+
+
+def test_query_by_indexed_fields(segment_path):
+    with AuditSegment(segment_path) as segment:
+        assert list(segment.query(action_id='add_to_cart')) == [RECORDS[1], RECORDS[2], RECORDS[4]]
+        assert list(segment.query(ai_agent='Claude', user_id='u2')) == [RECORDS[4]]
+        assert list(segment.query(action_id='add_to_cart', ai_agent='AtlasBot')) == [RECORDS[2]]
+        assert list(segment.query(action_id='checkout')) == []
+        assert list(segment.query(action_id='search_products', user_id='u2')) == []
+        # None means "any value"
+        assert list(segment.query(action_id=None, user_id='anonymous')) == [RECORDS[3]]
+
+
+def test_query_by_time_range(segment_path):
+    with AuditSegment(segment_path) as segment:
+        assert list(segment.query(since=1001.5, until=1003.0)) == RECORDS[1:4]
+        assert list(segment.query(since=1002.0, action_id='add_to_cart')) == [RECORDS[2], RECORDS[4]]
+        assert list(segment.query(since=2000.0)) == []
+        assert list(segment.query(until=999.0)) == []
+
+
+def test_query_rejects_unindexed_field(segment_path):
+    with AuditSegment(segment_path) as segment:
+        with pytest.raises(ValueError):
+            list(segment.query(ip_address='10.0.0.1'))
+
+
+def test_lookup_returns_offsets_in_file_order(segment_path):
+    offsets, _ = record_offsets(segment_path)
+    with AuditSegment(segment_path) as segment:
+        assert segment.lookup('action_id', 'add_to_cart') == [offsets[1], offsets[2], offsets[4]]
+        assert segment.lookup('user_id', 'nobody') == []
+
+
+def test_directory_describes_segment(segment_path):
+    with open(segment_path, 'rb') as f:
+        data = f.read()
+    index_offset, directory_offset, _ = TRAILER.unpack_from(data, len(data) - TRAILER.size)
+    directory = json.loads(data[directory_offset:len(data) - TRAILER.size])
+
+    assert index_offset % 8 == 0
+    assert directory['count'] == len(RECORDS)
+    assert set(directory['fields']) == {'action_id', 'ai_agent', 'user_id'}
+    assert directory['fields']['ai_agent']['AtlasBot'][1] == 2
+
+
+def test_truncated_segment_without_trailer_is_scanned(segment_path):
+    offsets, records_end = record_offsets(segment_path)
+
+    # Cut inside the last record, as after a crash mid-write
+    path = truncated_copy(segment_path, offsets[-1] + 10)
+    with AuditSegment(path) as segment:
+        assert not segment.indexed
+        assert segment.count == len(RECORDS) - 1
+        assert list(segment.query()) == RECORDS[:-1]
+        assert list(segment.query(action_id='add_to_cart')) == [RECORDS[1], RECORDS[2]]
+        assert list(segment.query(ai_agent='AtlasBot', since=1002.5)) == [RECORDS[3]]
+        assert (segment.min_ts, segment.max_ts) == (1000.0, 1003.0)
+
+    # Cut exactly at a record boundary
+    path = truncated_copy(segment_path, records_end)
+    with AuditSegment(path) as segment:
+        assert not segment.indexed
+        assert list(segment.query()) == RECORDS
+
+
+@pytest.mark.parametrize('aligned', [False, True], ids=['padded', 'aligned'])
+@pytest.mark.parametrize('extra', [1, 8, 20, 64])
+def test_segment_cut_inside_its_index_keeps_every_record(tmp_path, aligned, extra):
+    # Grow the last record until the index starts with (or without) padding
+    for size in range(8):
+        records = RECORDS[:-1] + [RECORDS[-1][:5] + ({'pad': 'x' * size},)]
+        directory = tmp_path / str(size)
+        segment_path = write_segments(directory, records)[0]
+        _, records_end = record_offsets(segment_path)
+        if (records_end % 8 == 0) == aligned:
+            break
+
+    path = truncated_copy(segment_path, records_end + extra)
+    with AuditSegment(path) as segment:
+        assert not segment.indexed
+        assert segment.count == len(records)
+        assert list(segment.query()) == records
+        assert list(segment.query(user_id='u1')) == records[:2]
+
+
+def test_segment_with_only_magic_is_empty(tmp_path):
+    path = str(tmp_path / 'open.awasseg')
+    with open(path, 'wb') as f:
+        f.write(SEGMENT_MAGIC)
+    with AuditSegment(path) as segment:
+        assert segment.count == 0
+        assert list(segment.query()) == []
+        assert list(segment.query(action_id='add_to_cart')) == []
+
+
+@pytest.mark.parametrize('content', [b'', b'{"not": "a segment"}\n'])
+def test_non_segment_is_rejected(tmp_path, content):
+    path = str(tmp_path / 'bad.awasseg')
+    with open(path, 'wb') as f:
+        f.write(content)
+    with pytest.raises(ValueError):
+        AuditSegment(path)
+
+
+def test_rotation_and_query_across_segments(tmp_path):
+    paths = write_segments(tmp_path, RECORDS * 4, batch_size=3, max_bytes=200)
+    assert len(paths) > 1
+
+    matches = list(query([str(tmp_path)], action_id='add_to_cart', ai_agent='Claude'))
+    assert matches == [RECORDS[1], RECORDS[4]] * 4
+
+    replayed = list(query([str(tmp_path)], replay=True, user_id='u2'))
+    assert [record[0] for record in replayed] == sorted(record[0] for record in replayed)
+    assert len(replayed) == 8
+
+
+def test_query_accepts_segment_files(segment_path):
+    partial = truncated_copy(segment_path, record_offsets(segment_path)[0][2])
+    assert list(query([segment_path, partial], action_id='search_products')) == \
+        [RECORDS[0], RECORDS[3], RECORDS[0]]
+    os.remove(partial)
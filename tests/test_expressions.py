@@ -0,0 +1,190 @@
+import re
+
+import pytest
+
+from awas_expressions import (
+    MAX_DEPTH, MAX_EXPRESSION_LENGTH, ExpressionError, compile_expression
+)
+
+NAMESPACE = {
+    'inputs': {'q': 'laptop', 'limit': 3},
+    'search_products': {
+        'results': [{'id': 'p1', 'price': 9.5, 'tags': ['sale']}, {'id': 'p2', 'price': 20}],
+        'total': 2,
+        'query': None,
+    },
+    'empty': {'results': []},
+}
+
+
+def evaluate(text, namespace=NAMESPACE):
+    return compile_expression(text)(namespace)
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('1', 1),
+    ('2.5', 2.5),
+    ("'it\\'s'", "it's"),
+    ('"a\\\\b"', 'a\\b'),
+    ('true', True),
+    ('false', False),
+    ('null', None),
+    ('inputs.q', 'laptop'),
+    ('search_products.results[1].id', 'p2'),
+    ('search_products.results[0].tags[0]', 'sale'),
+    ('len(search_products.results)', 2),
+    ('len(inputs.q)', 6),
+    ('(inputs.limit)', 3),
+])
+def test_operands(text, expected):
+    assert evaluate(text) == expected
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('inputs.limit == 3', True),
+    ('inputs.limit != 3', False),
+    ('inputs.limit < 4', True),
+    ('inputs.limit <= 2', False),
+    ('search_products.results[0].price > 9', True),
+    ('search_products.total >= 2', True),
+    ("'sale' in search_products.results[0].tags", True),
+    ("'new' not in search_products.results[0].tags", True),
+    ("'lap' in inputs.q", True),
+    ("'results' in empty", True),
+    ('search_products.results and len(search_products.results) > 0', True),
+    ('empty.results and len(empty.results) > 0', False),
+    ('empty.results or inputs.limit == 3', True),
+    ('not empty.results', True),
+    ('!search_products.results', False),
+    ('inputs.limit == 3 && !(inputs.q == "phone")', True),
+    ('false || null || inputs.limit < 0', False),
+    ('not not true', True),
+])
+def test_operators(text, expected):
+    assert bool(evaluate(text)) is expected
+
+
+def test_precedence():
+    # and binds tighter than or; not binds tighter than and
+    assert evaluate('true or false and false') is True
+    assert evaluate('(true or false) and false') is False
+    assert evaluate('not false and false') is False
+
+
+def test_short_circuit():
+    assert evaluate('false and missing.path > 1') is False
+    assert evaluate('true or missing.path > 1') is True
+
+
+@pytest.mark.parametrize('text', [
+    'missing',
+    'missing.deeper.still',
+    'inputs.q.length',
+    'search_products.results[5]',
+    'search_products.results[0][0]',
+    'inputs[0]',
+    'search_products.query.id',
+    'len(inputs.limit)',
+    'len(missing)',
+    # Paths only index dicts and lists, never Python attributes
+    'inputs.__class__',
+    'inputs.q.__len__',
+])
+def test_unresolved_paths_are_null(text):
+    assert evaluate(text) is None
+
+
+@pytest.mark.parametrize('text', [
+    "inputs.limit > 'a'",
+    'inputs.q < 1',
+    'search_products.query > 0',
+    'missing >= 0',
+    'search_products.results < inputs.limit',
+    "1 in inputs.limit",
+    "1 in inputs.q",
+    "search_products.results in search_products.results[0]",
+])
+def test_type_mismatches_are_false(text):
+    assert evaluate(text) is False
+
+
+def test_type_mismatch_negated_membership_is_true():
+    assert evaluate('1 not in inputs.q') is True
+
+
+def test_equality_across_types_does_not_raise():
+    assert evaluate("inputs.limit == '3'") is False
+    assert evaluate('search_products.query == null') is True
+
+
+def test_keyword_names_are_allowed_after_a_dot():
+    assert evaluate('data.len', {'data': {'len': 4}}) == 4
+    assert evaluate('data.in', {'data': {'in': True}}) is True
+
+
+@pytest.mark.parametrize('text, message', [
+    ('', 'non-empty'),
+    ('   ', 'non-empty'),
+    ('inputs.q ==', 'Unexpected end'),
+    ('inputs.q = 1', "Unexpected character"),
+    ('1 +', "Unexpected character"),
+    ('(inputs.q', "Expected ')'"),
+    ('inputs.q)', 'Unexpected token'),
+    ('len inputs.q', "Expected '('"),
+    ('inputs.', "Expected a name after '.'"),
+    ('inputs[q]', 'Expected an integer index'),
+    ('inputs[1.5]', 'Expected an integer index'),
+    ('inputs[0', "Expected ']'"),
+    ('1 2', 'Unexpected token'),
+    ('and', 'Unexpected token'),
+    ('"unterminated', 'Unexpected character'),
+    ('__import__("os")', "Unexpected token"),
+    ('inputs.q; 1', 'Unexpected character'),
+    ('lambda: 1', 'Unexpected character'),
+])
+def test_grammar_rejection(text, message):
+    with pytest.raises(ExpressionError, match=re.escape(message)):
+        compile_expression(text)
+
+
+def test_non_string_is_rejected():
+    with pytest.raises(ExpressionError):
+        compile_expression(None)
+    with pytest.raises(ExpressionError):
+        compile_expression(['inputs.q'])
+
+
+def test_error_reports_position():
+    with pytest.raises(ExpressionError, match='position 9'):
+        compile_expression('inputs.q = 1')
+
+
+def test_length_limit():
+    text = ' or '.join(['true'] * (MAX_EXPRESSION_LENGTH // 4))
+    assert len(text) > MAX_EXPRESSION_LENGTH
+    with pytest.raises(ExpressionError, match='longer than'):
+        compile_expression(text)
+
+    within = 'true' + ' ' * (MAX_EXPRESSION_LENGTH - 4)
+    assert compile_expression(within)({}) is True
+
+
+@pytest.mark.parametrize('nested', [
+    lambda n: '(' * n + 'true' + ')' * n,
+    lambda n: 'not ' * n + 'true',
+    lambda n: 'len(' * n + 'x' + ')' * n,
+], ids=['parentheses', 'not', 'len'])
+def test_depth_limit(nested):
+    compile_expression(nested(MAX_DEPTH))
+    with pytest.raises(ExpressionError, match='nested deeper'):
+        compile_expression(nested(MAX_DEPTH + 1))
+
+
+def test_compiled_expressions_are_reused():
+    assert compile_expression('inputs.limit > 1') is compile_expression('inputs.limit > 1')
+
+
+def test_invalid_expressions_are_not_cached():
+    for _ in range(2):
+        with pytest.raises(ExpressionError):
+            compile_expression('inputs.q ==')
@@ -0,0 +1,223 @@
+import asyncio
+import socket
+
+import pytest
+
+from awas_ratelimit import RateLimitEngine
+from awas_redis import (
+    AsyncConnectionPool, ConnectionPool, LocalRESPServer, PoolExhausted, RedisBackend
+)
+
+NOW = 1000.0
+
+
+@pytest.fixture
+def server():
+    server = LocalRESPServer()
+    server.start()
+    yield server
+    server.stop()
+
+
+def make_backend(port, burst=3, concurrent=None, **kwargs):
+    backend = RedisBackend(ConnectionPool('127.0.0.1', port, timeout=1.0), **kwargs)
+    backend.bind(RateLimitEngine([('burst', burst, 10)], concurrent_requests=concurrent))
+    return backend
+
+
+def counter(server, key):
+    value = server.data.get(key.encode())
+    return None if value is None else int(value)
+
+
+def closed_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def test_allows_up_to_limit_then_rejects(server):
+    backend = make_backend(server.port)
+
+    decisions = [backend.hit('bot', NOW) for _ in range(4)]
+
+    assert [d.exceeded for d in decisions] == [None, None, None, 'burst']
+    assert [d.remaining for d in decisions] == [2, 1, 0, 0]
+    assert decisions[3].retry_after > 0
+    assert backend.remote_checks == 4
+    assert backend.fallback_checks == 0
+
+
+def test_rejected_check_is_refunded(server):
+    backend = make_backend(server.port)
+    for _ in range(5):
+        backend.hit('bot', NOW)
+
+    # Only the three allowed requests stay counted
+    assert counter(server, 'awas:rl:bot:burst:100') == 3
+
+
+def test_count_rejected_keeps_increments(server):
+    backend = make_backend(server.port, count_rejected=True)
+    for _ in range(5):
+        backend.hit('bot', NOW)
+
+    assert counter(server, 'awas:rl:bot:burst:100') == 5
+
+
+def test_batch_cost_is_refunded_as_a_whole(server):
+    backend = make_backend(server.port, burst=5)
+    assert backend.hit('bot', NOW, cost=4).exceeded is None
+    assert backend.hit('bot', NOW, cost=4).exceeded == 'burst'
+    assert counter(server, 'awas:rl:bot:burst:100') == 4
+
+
+def test_previous_window_is_weighted(server):
+    backend = make_backend(server.port)
+    for _ in range(3):
+        backend.hit('bot', NOW)
+
+    # Halfway into the next window half of the previous window still counts
+    assert backend.hit('bot', NOW + 15).remaining == 0
+    assert backend.hit('bot', NOW + 15).exceeded == 'burst'
+
+
+def test_clients_are_counted_separately(server):
+    backend = make_backend(server.port, burst=1)
+    assert backend.hit('alice', NOW).exceeded is None
+    assert backend.hit('bob', NOW).exceeded is None
+    assert backend.hit('alice', NOW).exceeded == 'burst'
+
+
+def test_concurrency_incr_and_decr(server):
+    backend = make_backend(server.port, burst=100, concurrent=2)
+    key = 'awas:rl:bot:concurrent'
+
+    assert backend.hit('bot', NOW).exceeded is None
+    assert backend.hit('bot', NOW).exceeded is None
+    assert counter(server, key) == 2
+
+    # The rejected request gives its slot back at once
+    assert backend.hit('bot', NOW).exceeded == 'concurrent'
+    assert counter(server, key) == 2
+
+    backend.release('bot', NOW)
+    assert counter(server, key) == 1
+    assert backend.hit('bot', NOW).exceeded is None
+    assert counter(server, key) == 2
+
+
+def test_falls_back_to_local_limits_when_store_is_down():
+    backend = make_backend(closed_port(), retry_interval=5.0)
+
+    decisions = [backend.hit('bot', NOW) for _ in range(4)]
+
+    assert [d.exceeded for d in decisions] == [None, None, None, 'burst']
+    assert backend.remote_checks == 0
+    assert backend.fallback_checks == 4
+
+
+def test_retries_store_after_retry_interval(server):
+    backend = make_backend(closed_port(), retry_interval=5.0)
+    backend.hit('bot', NOW)
+
+    # The store comes back; inside the retry interval it is not contacted
+    backend.pool = ConnectionPool('127.0.0.1', server.port, timeout=1.0)
+    backend.hit('bot', NOW + 1)
+    assert backend.remote_checks == 0
+
+    backend.hit('bot', NOW + 6)
+    assert backend.remote_checks == 1
+    assert counter(server, 'awas:rl:bot:burst:100') == 1
+
+
+def test_pool_exhausted_uses_local_limits_without_backing_off(server):
+    pool = ConnectionPool('127.0.0.1', server.port, max_connections=1, timeout=0.05)
+    backend = RedisBackend(pool)
+    backend.bind(RateLimitEngine([('burst', 3, 10)]))
+
+    conn = pool.acquire()
+    with pytest.raises(PoolExhausted):
+        pool.acquire()
+
+    assert backend.hit('bot', NOW).exceeded is None
+    assert backend.fallback_checks == 1
+
+    # Busy connections are not a store failure: the next check goes remote
+    pool.release(conn)
+    assert backend.hit('bot', NOW).exceeded is None
+    assert backend.remote_checks == 1
+
+
+def test_pool_reuses_released_connections(server):
+    pool = ConnectionPool('127.0.0.1', server.port, max_connections=1, timeout=0.05)
+    replies = [pool.pipeline([('INCR', 'n')]) for _ in range(3)]
+    pool.close()
+
+    assert replies == [[1], [2], [3]]
+
+
+def test_async_pool_allows_rejects_and_refunds(server):
+    async def run():
+        pool = AsyncConnectionPool('127.0.0.1', server.port, timeout=1.0)
+        backend = RedisBackend(None, async_pool=pool)
+        backend.bind(RateLimitEngine([('burst', 3, 10)], concurrent_requests=2))
+        try:
+            first = [await backend.ahit('bot', NOW) for _ in range(2)]
+            rejected = await backend.ahit('bot', NOW)
+            in_flight = counter(server, 'awas:rl:bot:concurrent')
+            await backend.arelease('bot', NOW)
+            await backend.arelease('bot', NOW)
+            third = await backend.ahit('bot', NOW)
+            over = await backend.ahit('bot', NOW)
+            return first, rejected, in_flight, third, over, backend
+        finally:
+            pool.close()
+
+    first, rejected, in_flight, third, over, backend = asyncio.run(run())
+
+    assert [d.exceeded for d in first] == [None, None]
+    assert rejected.exceeded == 'concurrent'
+    assert in_flight == 2
+    assert third.exceeded is None
+    assert over.exceeded == 'burst'
+    assert counter(server, 'awas:rl:bot:burst:100') == 3
+    assert counter(server, 'awas:rl:bot:concurrent') == 1
+    assert backend.remote_checks == 5
+
+
+def test_async_pool_exhausted_uses_local_limits(server):
+    async def run():
+        pool = AsyncConnectionPool('127.0.0.1', server.port, max_connections=1, timeout=0.05)
+        backend = RedisBackend(None, async_pool=pool)
+        backend.bind(RateLimitEngine([('burst', 3, 10)]))
+        await pool._permits.acquire()
+        try:
+            with pytest.raises(PoolExhausted):
+                await pool.pipeline([('PING',)])
+            decision = await backend.ahit('bot', NOW)
+        finally:
+            pool._permits.release()
+        remote = await backend.ahit('bot', NOW)
+        pool.close()
+        return decision, remote, backend
+
+    decision, remote, backend = asyncio.run(run())
+
+    assert decision.exceeded is None
+    assert remote.exceeded is None
+    assert backend.fallback_checks == 1
+    assert backend.remote_checks == 1
+
+
+def test_async_falls_back_when_store_is_down():
+    async def run():
+        pool = AsyncConnectionPool('127.0.0.1', closed_port(), timeout=0.5)
+        backend = RedisBackend(None, async_pool=pool)
+        backend.bind(RateLimitEngine([('burst', 1, 10)]))
+        return [await backend.ahit('bot', NOW) for _ in range(2)], backend
+
+    decisions, backend = asyncio.run(run())
+
+    assert [d.exceeded for d in decisions] == [None, 'burst']
+    assert backend.fallback_checks == 2
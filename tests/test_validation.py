@@ -0,0 +1,271 @@
+import pytest
+
+from awas_validation import ActionValidator, CompiledSchema, compile_inputs, compile_schema
+
+
+def errors(schema, instance):
+    return CompiledSchema(schema).validate(instance)
+
+
+@pytest.mark.parametrize('schema_type, valid, invalid', [
+    ('string', 'a', 1),
+    ('integer', 3, 3.5),
+    ('integer', 3.0, '3'),
+    ('number', 2.5, '2.5'),
+    ('boolean', False, 0),
+    ('array', [], {}),
+    ('object', {}, []),
+    ('null', None, 0),
+])
+def test_type(schema_type, valid, invalid):
+    schema = {'type': schema_type}
+    assert errors(schema, valid) == []
+    assert errors(schema, invalid) == [f"Request parameters should be {schema_type}"]
+
+
+def test_booleans_are_not_numbers():
+    assert errors({'type': 'integer'}, True) == ["Request parameters should be integer"]
+    assert errors({'type': 'number'}, False) == ["Request parameters should be number"]
+
+
+def test_type_union():
+    schema = {'type': ['string', 'null']}
+    assert errors(schema, None) == []
+    assert errors(schema, 'x') == []
+    assert errors(schema, 1) == ["Request parameters should be string or null"]
+
+
+def test_type_mismatch_skips_other_keywords():
+    assert errors({'type': 'string', 'minLength': 3}, 5) == ["Request parameters should be string"]
+
+
+def test_enum_and_const():
+    assert errors({'enum': ['a', 'b']}, 'a') == []
+    assert errors({'enum': ['a', 'b']}, 'c') == ["Request parameters must be one of: a, b"]
+    assert errors({'enum': [[1], {'k': 2}]}, [1]) == []
+    assert errors({'enum': ['a']}, ['a']) == ["Request parameters must be one of: a"]
+    assert errors({'const': 7}, 7) == []
+    assert errors({'const': 7}, 8) == ["Request parameters must be 7"]
+
+
+def test_string_keywords():
+    schema = {'type': 'string', 'minLength': 2, 'maxLength': 4, 'pattern': '[0-9]'}
+    assert errors(schema, 'a1') == []
+    assert errors(schema, 'a') == [
+        "Request parameters does not match required pattern",
+        "Request parameters must have length >= 2",
+    ]
+    assert errors(schema, 'abcde1') == ["Request parameters must have length <= 4"]
+
+
+def test_schema_pattern_is_unanchored():
+    assert errors({'pattern': 'b'}, 'abc') == []
+
+
+def test_number_keywords():
+    schema = {'minimum': 1, 'maximum': 10, 'multipleOf': 0.5}
+    assert errors(schema, 1) == []
+    assert errors(schema, 10) == []
+    assert errors(schema, 2.5) == []
+    assert errors(schema, 0) == ["Request parameters must be >= 1"]
+    assert errors(schema, 10.25) == [
+        "Request parameters must be <= 10",
+        "Request parameters must be a multiple of 0.5",
+    ]
+
+    exclusive = {'exclusiveMinimum': 0, 'exclusiveMaximum': 5}
+    assert errors(exclusive, 0) == ["Request parameters must be > 0"]
+    assert errors(exclusive, 5) == ["Request parameters must be < 5"]
+    assert errors(exclusive, 'text') == []
+
+
+def test_array_keywords():
+    schema = {'type': 'array', 'minItems': 1, 'maxItems': 2, 'items': {'type': 'integer'}}
+    assert errors(schema, [1, 2]) == []
+    assert errors(schema, []) == ["Request parameters must have at least 1 items"]
+    assert errors(schema, [1, 'x', 3]) == [
+        "Request parameters must have at most 2 items",
+        "Parameter '[]' should be integer",
+    ]
+
+
+def test_positional_items():
+    schema = {'items': [{'type': 'string'}, {'type': 'integer'}]}
+    assert errors(schema, ['a', 1, None]) == []
+    assert errors(schema, [1, 'a']) == [
+        "Parameter '[0]' should be string",
+        "Parameter '[1]' should be integer",
+    ]
+
+
+def test_object_keywords_collect_every_error():
+    schema = {
+        'type': 'object',
+        'properties': {
+            'q': {'type': 'string', 'minLength': 1},
+            'page': {'type': 'integer', 'minimum': 1},
+            'filters': {
+                'type': 'object',
+                'properties': {'color': {'enum': ['red']}},
+                'required': ['color'],
+            },
+        },
+        'required': ['q'],
+        'additionalProperties': False,
+    }
+    assert errors(schema, {'q': 'a', 'page': 2, 'filters': {'color': 'red'}}) == []
+    assert errors(schema, {'page': 0, 'filters': {'color': 'blue'}, 'x': 1}) == [
+        "Parameter 'q' is required",
+        "Parameter 'page' must be >= 1",
+        "Parameter 'filters.color' must be one of: red",
+        "Unexpected parameter 'x'",
+    ]
+    assert errors(schema, {'q': 'a', 'filters': {}}) == ["Parameter 'filters.color' is required"]
+
+
+def test_null_property_counts_as_missing():
+    schema = {'properties': {'q': {'type': 'string'}}, 'required': ['q']}
+    assert errors(schema, {'q': None}) == ["Parameter 'q' is required"]
+
+
+def test_additional_properties_schema():
+    schema = {'properties': {'id': {}}, 'additionalProperties': {'type': 'integer'}}
+    assert errors(schema, {'id': 'x', 'n': 1}) == []
+    assert errors(schema, {'n': 'x'}) == ["Parameter '*' should be integer"]
+
+
+def test_boolean_subschemas():
+    assert errors(True, 'anything') == []
+    assert errors(False, 'anything') == ["Request parameters is not allowed"]
+    assert errors({'properties': {'gone': False}}, {'gone': 1}) == ["Parameter 'gone' is not allowed"]
+
+
+def test_ref_into_definitions():
+    schema = {
+        'definitions': {'sku': {'type': 'string', 'pattern': '^sku_'}},
+        'properties': {'sku': {'$ref': '#/definitions/sku'}},
+    }
+    assert errors(schema, {'sku': 'sku_1'}) == []
+    assert errors(schema, {'sku': 'x'}) == ["Parameter 'sku' does not match required pattern"]
+
+
+def test_ref_overrides_siblings():
+    schema = {
+        'definitions': {'n': {'type': 'integer'}},
+        'properties': {'n': {'$ref': '#/definitions/n', 'minimum': 100}},
+    }
+    assert errors(schema, {'n': 1}) == []
+
+
+def test_recursive_ref():
+    schema = {
+        'definitions': {
+            'node': {
+                'type': 'object',
+                'properties': {
+                    'value': {'type': 'integer'},
+                    'children': {'type': 'array', 'items': {'$ref': '#/definitions/node'}},
+                },
+                'required': ['value'],
+            }
+        },
+        '$ref': '#/definitions/node',
+    }
+    tree = {'value': 1, 'children': [{'value': 2, 'children': [{'value': 3}]}]}
+    assert errors(schema, tree) == []
+
+    broken = {'value': 1, 'children': [{'value': 2, 'children': [{'value': 'x'}, {}]}]}
+    assert len(errors(schema, broken)) == 2
+
+
+def test_escaped_ref_pointer():
+    schema = {'definitions': {'a/b': {'type': 'string'}}, '$ref': '#/definitions/a~1b'}
+    assert errors(schema, 1) == ["Request parameters should be string"]
+
+
+def test_remote_ref_is_rejected():
+    with pytest.raises(ValueError):
+        CompiledSchema({'$ref': 'https://example.com/schema.json'})
+
+
+def test_all_of_collects_every_subschema_error():
+    schema = {'allOf': [{'minimum': 5}, {'multipleOf': 2}]}
+    assert errors(schema, 6) == []
+    assert errors(schema, 3) == [
+        "Request parameters must be >= 5",
+        "Request parameters must be a multiple of 2",
+    ]
+
+
+def test_any_of():
+    schema = {'anyOf': [{'type': 'string'}, {'type': 'integer'}]}
+    assert errors(schema, 'a') == []
+    assert errors(schema, 1) == []
+    assert errors(schema, 1.5) == ["Request parameters does not match any allowed schema"]
+
+
+def test_one_of_reports_one_error_instead_of_subschema_errors():
+    schema = {'oneOf': [{'type': 'integer'}, {'minimum': 10}]}
+    assert errors(schema, 3) == []
+    assert errors(schema, 10.5) == []
+    # Matches both
+    assert errors(schema, 12) == ["Request parameters must match exactly one allowed schema"]
+    # Matches neither; the failing subschemas' own errors are not reported
+    assert errors(schema, 9.5) == ["Request parameters must match exactly one allowed schema"]
+
+
+def test_not():
+    schema = {'not': {'type': 'string'}}
+    assert errors(schema, 1) == []
+    assert errors(schema, 'x') == ["Request parameters matches a disallowed schema"]
+
+
+def test_combinator_errors_are_collected_with_others():
+    schema = {
+        'properties': {
+            'mode': {'oneOf': [{'const': 'a'}, {'const': 'b'}]},
+            'tag': {'not': {'enum': ['admin']}},
+            'n': {'type': 'integer'},
+        }
+    }
+    assert errors(schema, {'mode': 'c', 'tag': 'admin', 'n': 'x'}) == [
+        "Parameter 'mode' must match exactly one allowed schema",
+        "Parameter 'tag' matches a disallowed schema",
+        "Parameter 'n' should be integer",
+    ]
+
+
+def test_defaults_of_top_level_properties():
+    schema = {'properties': {'quantity': {'type': 'integer', 'default': 1}, 'q': {}}}
+    assert CompiledSchema(schema).defaults == {'quantity': 1}
+
+
+def test_compile_schema_reuses_identical_schemas():
+    assert compile_schema({'type': 'string'}) is compile_schema({'type': 'string'})
+    assert compile_schema({'type': 'string'}) is not compile_schema({'type': 'integer'})
+
+
+def test_legacy_inputs():
+    validate = compile_inputs([
+        {'name': 'q', 'type': 'string', 'required': True, 'validation': {'pattern': '[a-z]+'}},
+        {'name': 'qty', 'type': 'integer', 'validation': {'min': 1, 'max': 10}},
+    ])
+    assert validate({'q': 'abc', 'qty': 3}) == []
+    assert validate({}) == ["Parameter 'q' is required"]
+    # Legacy patterns are anchored at the start
+    assert validate({'q': '1a'}) == ["Parameter 'q' does not match required pattern"]
+    assert validate({'q': 'a', 'qty': 'x'}) == ["Parameter 'qty' should be integer"]
+    assert validate({'q': 'a', 'qty': 11}) == ["Parameter 'qty' must be <= 10"]
+
+
+def test_action_validator_merges_duplicate_errors_and_applies_defaults():
+    validator = ActionValidator({
+        'inputs': [{'name': 'q', 'type': 'string', 'required': True}],
+        'inputSchema': {
+            'type': 'object',
+            'properties': {'q': {'type': 'string'}, 'page': {'type': 'integer', 'default': 1}},
+            'required': ['q'],
+        },
+    })
+    assert validator({}) == ["Parameter 'q' is required"]
+    assert validator.apply_defaults({'q': 'a', 'page': None}) == {'q': 'a', 'page': 1}